@@ -10,14 +10,9 @@ import sys
 import logging
 import argparse
 from datetime import datetime
+from pathlib import Path
 
-from src.ingestion.crawler import YouTubeChannelCrawler
-from src.processing.processor import VideoProcessor
-from src.semantic.chunker import ContentChunker
-from src.semantic.embedder import ContentEmbedder
-from src.memory.vector_db import VectorDatabase
-from src.interface.enhanced_cli import EnhancedCLI
-from src.utils.refresh import RefreshManager
+from src.utils.channels import channel_name_from_handle
 
 # Configure logging
 logging.basicConfig(
@@ -30,20 +25,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Base directory of the project
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 def setup_directories(base_dir):
     """Create necessary directories if they don't exist."""
-    dirs = [
-        os.path.join(base_dir, 'data', 'raw'),
-        os.path.join(base_dir, 'data', 'processed'),
-        os.path.join(base_dir, 'data', 'embeddings'),
-        os.path.join(base_dir, 'data', 'index'),
-        os.path.join(base_dir, 'data', 'history'),
-        os.path.join(base_dir, 'data', 'config')
-    ]
+    data_dir = Path(base_dir) / 'data'
+    
+    # One directory scan instead of a makedirs stat-walk per directory
+    existing = {entry.name for entry in os.scandir(data_dir) if entry.is_dir()} if data_dir.is_dir() else set()
     
-    for directory in dirs:
-        os.makedirs(directory, exist_ok=True)
-        logger.info(f"Ensured directory exists: {directory}")
+    for name in ('raw', 'processed', 'embeddings', 'index', 'history', 'config'):
+        if name not in existing:
+            (data_dir / name).mkdir(parents=True, exist_ok=True)
+            logger.debug(f"Created directory: {data_dir / name}")
 
 def main():
     """Main entry point for the YouTube Channel Conversational AI Expert."""
@@ -94,6 +89,12 @@ def main():
         help="Update channel with new content (performs all steps)"
     )
     
+    parser.add_argument(
+        "--force-refresh", 
+        action="store_true",
+        help="Re-crawl all videos, ignoring previously crawled data"
+    )
+    
     parser.add_argument(
         "--query", 
         type=str,
@@ -116,38 +117,49 @@ def main():
     args = parser.parse_args()
     
     # Get base directory
-    base_dir = os.path.dirname(os.path.abspath(__file__))
+    base_dir = BASE_DIR
     
     # Setup directories
     setup_directories(base_dir)
     
     # Extract channel name from handle
-    channel_name = args.channel.replace('@', '')
+    try:
+        channel_name = channel_name_from_handle(args.channel)
+    except ValueError as e:
+        print(f"\nError: {str(e)}")
+        return 1
     
     # Initialize refresh manager
+    # Pipeline modules are imported where used, so each invocation only
+    # loads the heavy dependencies (torch, faiss, crawl4ai) it needs
+    from src.utils.refresh import RefreshManager
     refresh_manager = RefreshManager(base_dir)
     
     # Set refresh mode if specified
     if args.refresh_mode:
         refresh_manager.set_refresh_mode(args.refresh_mode)
+        refresh_manager.config_manager.flush()
         print(f"Refresh mode set to: {args.refresh_mode.upper()}")
     
     try:
         # Determine which operations to perform
         if args.update:
-            success = refresh_manager.refresh_channel(args.channel)
+            success = refresh_manager.refresh_channel(args.channel, force_refresh=args.force_refresh)
             if not success:
                 return 1
         else:
             if args.crawl:
-                crawler = YouTubeChannelCrawler(
+                from src.ingestion.crawler import YouTubeChannelCrawler
+                with YouTubeChannelCrawler(
                     channel_handle=args.channel,
-                    output_dir=os.path.join(base_dir, 'data')
-                )
-                crawl_result = crawler.crawl_channel()
+                    output_dir=os.path.join(base_dir, 'data'),
+                    force_refresh=args.force_refresh
+                ) as crawler:
+                    crawl_result = crawler.crawl_channel()
                 print(f"\nCrawled {args.channel}, found {crawl_result['videos_count']} videos")
             
             if args.process:
+                from src.processing.processor import VideoProcessor
                 processor = VideoProcessor(
                     raw_data_dir=os.path.join(base_dir, 'data', 'raw'),
                     processed_data_dir=os.path.join(base_dir, 'data', 'processed')
@@ -156,6 +168,7 @@ def main():
                 print(f"\nProcessed {len(process_result)} videos for {channel_name}")
             
             if args.chunk:
+                from src.semantic.chunker import ContentChunker
                 chunker = ContentChunker(
                     processed_data_dir=os.path.join(base_dir, 'data', 'processed'),
                     chunked_data_dir=os.path.join(base_dir, 'data', 'embeddings')
@@ -164,6 +177,7 @@ def main():
                 print(f"\nChunked {len(chunk_result)} videos for {channel_name}")
             
             if args.embed:
+                from src.semantic.embedder import ContentEmbedder
                 embedder = ContentEmbedder(
                     chunked_data_dir=os.path.join(base_dir, 'data', 'embeddings'),
                     embeddings_dir=os.path.join(base_dir, 'data', 'embeddings')
@@ -172,6 +186,7 @@ def main():
                 print(f"\nEmbedded {len(embed_result)} videos for {channel_name}")
             
             if args.index:
+                from src.memory.vector_db import VectorDatabase
                 vector_db = VectorDatabase(
                     embeddings_dir=os.path.join(base_dir, 'data', 'embeddings'),
                     index_dir=os.path.join(base_dir, 'data', 'index')
@@ -184,9 +199,11 @@ def main():
         
         # Run query or interactive mode
         if args.query:
+            from src.interface.enhanced_cli import EnhancedCLI
             cli = EnhancedCLI(base_dir=base_dir, channel_name=channel_name)
             cli.run_single_query(args.query)
         elif args.interactive:
+            from src.interface.enhanced_cli import EnhancedCLI
             cli = EnhancedCLI(base_dir=base_dir, channel_name=channel_name)
             cli.run_interactive()
         
@@ -6,52 +6,170 @@ It extracts video metadata, descriptions, and transcripts from a specified YouTu
 """
 
 import os
-import json
+import re
+import time
+import queue
+import atexit
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from operator import itemgetter
+from typing import Dict, Iterator, List, Any, Optional, Set
 
 from crawl4ai import Crawler
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from src.utils.channels import channel_name_from_handle
+from src.utils.json_utils import (
+    ZSTD_SUFFIX, compressed_path, dumps, dumps_jsonl, find_jsonl, read_json, write_json
 )
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Stops the writer thread when queued in place of a file
+_STOP_WRITER = object()
 
 class YouTubeChannelCrawler:
     """
     Crawler for extracting content from YouTube channels using crawl4ai.
     """
     
-    def __init__(self, channel_handle: str, output_dir: str):
+    # Previously crawled videos younger than this are not crawled again
+    VIDEO_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+    
+    # Matches youtube.com/watch?v=VIDEO_ID and youtu.be/VIDEO_ID links
+    _VIDEO_ID_RE = re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/)([A-Za-z0-9_-]{11})')
+    
+    # Video fields copied into the videos summary
+    _summary_fields = itemgetter('video_id', 'title', 'url')
+    
+    def __init__(self, channel_handle: str, output_dir: str, force_refresh: bool = False):
         """
         Initialize the YouTube channel crawler.
         
         Args:
-            channel_handle: YouTube channel handle (e.g., @ManusAGI)
+            channel_handle: YouTube channel handle, with or without @ (e.g., @ManusAGI)
             output_dir: Directory to save crawled data
+            force_refresh: Re-crawl videos even if they were crawled recently
+            
+        Raises:
+            ValueError: If the channel handle is empty
         """
-        self.channel_handle = channel_handle
+        # Accept handles with or without the @ symbol
+        self.channel_name = channel_name_from_handle(channel_handle)
+        self.channel_handle = f"@{self.channel_name}"
+        
         self.output_dir = output_dir
+        self.force_refresh = force_refresh
         self.raw_dir = os.path.join(output_dir, 'raw')
-        self.channel_dir = os.path.join(self.raw_dir, channel_handle.replace('@', ''))
+        self.channel_dir = os.path.join(self.raw_dir, self.channel_name)
+        
+        self._videos_dir = os.path.join(self.channel_dir, 'videos')
         
         # Create directories if they don't exist
-        os.makedirs(self.channel_dir, exist_ok=True)
-        os.makedirs(os.path.join(self.channel_dir, 'videos'), exist_ok=True)
+        os.makedirs(self._videos_dir, exist_ok=True)
+        
+        # Video directories known to exist, so re-crawls skip makedirs
+        self._created_dirs: Set[str] = set()
+        
+        # crawl4ai crawlers are created per thread, see the crawler property
+        self._local = threading.local()
+        
+        # Number of concurrent network workers
+        self.max_workers = int(os.environ.get('YTAI_CRAWL_WORKERS', 16))
+        
+        # Transcript fetches run alongside the watch page crawl
+        self._transcript_executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        
+        # Channel page crawl result, shared by metadata and video URL extraction
+        self._channel_result = None
         
-        # Initialize crawl4ai crawler
-        self.crawler = Crawler()
+        # Per-video files are written by a single writer thread so crawl
+        # workers only serialize and stay on the network
+        self._write_queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_worker, daemon=True)
+        self._writer.start()
         
-        logger.info(f"Initialized YouTube channel crawler for {channel_handle}")
+        # Queued files are written when the interpreter exits, unless the
+        # crawler was closed before
+        atexit.register(self.close)
+        
+        logger.info(f"Initialized YouTube channel crawler for {self.channel_handle}")
+    
+    @property
+    def crawler(self) -> Crawler:
+        """
+        Get the crawl4ai crawler of the current thread.
+        
+        Each crawl worker gets its own crawler, and with it its own
+        connection pool, so workers don't contend on a shared session.
+        """
+        crawler = getattr(self._local, 'crawler', None)
+        if crawler is None:
+            crawler = self._local.crawler = Crawler()
+        return crawler
+    
+    def _write_worker(self) -> None:
+        """Write queued (path, payload) pairs to disk until stopped."""
+        while True:
+            item = self._write_queue.get()
+            if item is _STOP_WRITER:
+                self._write_queue.task_done()
+                return
+            
+            # Written under a temporary name first, so a crash mid-write
+            # doesn't leave a truncated file behind
+            path, payload = item
+            tmp_path = path + '.tmp'
+            try:
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    view = memoryview(payload)
+                    while view:
+                        view = view[os.write(fd, view):]
+                finally:
+                    os.close(fd)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Error writing {path}: {str(e)}")
+            finally:
+                self._write_queue.task_done()
+    
+    def flush_writes(self) -> None:
+        """Block until all queued per-video files have been written."""
+        self._write_queue.join()
+    
+    def close(self) -> None:
+        """
+        Shut down the crawler's background threads once crawling is done.
+        
+        Queued files are written before the writer thread stops.
+        """
+        if self._writer.is_alive():
+            self._write_queue.put(_STOP_WRITER)
+            self._writer.join()
+        self._transcript_executor.shutdown(wait=True)
+        atexit.unregister(self.close)
+    
+    def __enter__(self) -> 'YouTubeChannelCrawler':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
     
     def get_channel_url(self) -> str:
         """Get the YouTube channel URL from the handle."""
         return f"https://www.youtube.com/{self.channel_handle}"
     
+    def _channel_result_cached(self):
+        """Crawl the channel page once and reuse the result."""
+        if self._channel_result is None:
+            self._channel_result = self.crawler.crawl(self.get_channel_url())
+        return self._channel_result
+    
     def crawl_channel_metadata(self) -> Dict[str, Any]:
         """
         Crawl channel metadata using crawl4ai.
@@ -63,7 +181,7 @@ class YouTubeChannelCrawler:
         logger.info(f"Crawling channel metadata from {channel_url}")
         
         # Use crawl4ai to extract channel metadata
-        result = self.crawler.crawl(channel_url)
+        result = self._channel_result_cached()
         
         # Extract relevant channel information
         channel_data = {
@@ -77,8 +195,7 @@ class YouTubeChannelCrawler:
         
         # Save channel metadata
         metadata_path = os.path.join(self.channel_dir, 'channel_metadata.json')
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(channel_data, f, ensure_ascii=False, indent=2)
+        write_json(metadata_path, channel_data)
         
         logger.info(f"Channel metadata saved to {metadata_path}")
         return channel_data
@@ -94,41 +211,92 @@ class YouTubeChannelCrawler:
         logger.info(f"Extracting video URLs from {channel_url}")
         
         # Use crawl4ai to extract links from the channel page
-        result = self.crawler.crawl(channel_url)
+        result = self._channel_result_cached()
         links = result.get_links() or []
         
-        # Filter for video links
-        video_urls = [
-            link for link in links 
-            if 'youtube.com/watch?v=' in link or 'youtu.be/' in link
-        ]
+        # Extract video IDs in one regex scan per link; the channel page
+        # links the same video from several places, so keep one canonical
+        # URL per video ID
+        video_ids = dict.fromkeys(
+            match.group(1) for link in links 
+            if (match := self._VIDEO_ID_RE.search(link))
+        )
+        video_urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids]
         
         # Save video URLs
         urls_path = os.path.join(self.channel_dir, 'video_urls.json')
-        with open(urls_path, 'w', encoding='utf-8') as f:
-            json.dump(video_urls, f, ensure_ascii=False, indent=2)
+        write_json(urls_path, video_urls)
         
         logger.info(f"Found {len(video_urls)} videos, URLs saved to {urls_path}")
         return video_urls
     
     def extract_video_id(self, url: str) -> Optional[str]:
         """Extract video ID from a YouTube URL."""
-        if 'youtube.com/watch?v=' in url:
-            # Handle youtube.com/watch?v=VIDEO_ID format
-            video_id = url.split('youtube.com/watch?v=')[1].split('&')[0]
-        elif 'youtu.be/' in url:
-            # Handle youtu.be/VIDEO_ID format
-            video_id = url.split('youtu.be/')[1].split('?')[0]
-        else:
+        match = self._VIDEO_ID_RE.search(url)
+        if not match:
             logger.warning(f"Could not extract video ID from URL: {url}")
             return None
         
-        return video_id
+        return match.group(1)
+    
+    def _cached_video_path(self, video_url: str) -> Optional[str]:
+        """
+        Get the path of previously crawled video data if it is still fresh.
+        
+        Args:
+            video_url: YouTube video URL
+            
+        Returns:
+            Path of the cached video data, or None if the video needs to be crawled
+        """
+        if self.force_refresh:
+            return None
+        
+        video_id = self.extract_video_id(video_url)
+        if not video_id:
+            return None
+        
+        video_path = f"{self._videos_dir}{os.sep}{video_id}{os.sep}video_data.json"
+        if not os.path.exists(video_path):
+            return None
+        self._created_dirs.add(f"{self._videos_dir}{os.sep}{video_id}")
+        
+        if os.path.getmtime(video_path) <= time.time() - self.VIDEO_CACHE_TTL_SECONDS:
+            return None
+        
+        return video_path
+    
+    def load_cached_video(self, video_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Load previously crawled video data if it is still fresh.
+        
+        Args:
+            video_url: YouTube video URL
+            
+        Returns:
+            Cached video data, or None if the video needs to be crawled
+        """
+        video_path = self._cached_video_path(video_url)
+        if video_path is None:
+            return None
+        
+        return self._read_cached_video(video_url, video_path)
+    
+    def _read_cached_video(self, video_url: str, video_path: str) -> Optional[Dict[str, Any]]:
+        """Read cached video data from a path found by _cached_video_path, or None if unreadable."""
+        try:
+            return read_json(video_path)
+        except Exception as e:
+            logger.warning(f"Could not load cached data for video {video_url}: {str(e)}")
+            return None
     
     def crawl_video_content(self, video_url: str) -> Dict[str, Any]:
         """
         Crawl video content including metadata, description, and transcript.
         
+        Files are written by the background writer; call flush_writes()
+        before reading them back.
+        
         Args:
             video_url: YouTube video URL
             
@@ -141,6 +309,9 @@ class YouTubeChannelCrawler:
         
         logger.info(f"Crawling content for video ID: {video_id}")
         
+        # Fetch the transcript while the watch page is being crawled
+        transcript_future = self._transcript_executor.submit(self.get_video_transcript, video_id)
+        
         # Use crawl4ai to extract video content
         result = self.crawler.crawl(video_url)
         
@@ -151,20 +322,31 @@ class YouTubeChannelCrawler:
             'title': result.get_title() or f"Video {video_id}",
             'description': result.get_description() or '',
             'metadata': result.get_metadata() or {},
-            'crawl_date': datetime.now().isoformat(),
-            'transcript': self.get_video_transcript(video_id)
+            'crawl_date': datetime.now().isoformat()
         }
+        transcript = transcript_future.result()
         
         # Save video data
-        video_dir = os.path.join(self.channel_dir, 'videos', video_id)
-        os.makedirs(video_dir, exist_ok=True)
-        
-        video_path = os.path.join(video_dir, 'video_data.json')
-        with open(video_path, 'w', encoding='utf-8') as f:
-            json.dump(video_data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Video data saved to {video_path}")
-        return video_data
+        video_dir = f"{self._videos_dir}{os.sep}{video_id}"
+        if video_dir not in self._created_dirs:
+            os.makedirs(video_dir, exist_ok=True)
+            self._created_dirs.add(video_dir)
+        
+        video_path = f"{video_dir}{os.sep}video_data.json"
+        self._write_queue.put((video_path, dumps(video_data)))
+        
+        # Save transcript separately, one segment per line, so metadata
+        # readers don't have to parse it
+        if transcript:
+            transcript_path = compressed_path(f"{video_dir}{os.sep}transcript.jsonl")
+            payload = dumps_jsonl(transcript, compress=transcript_path.endswith(ZSTD_SUFFIX))
+            self._write_queue.put((transcript_path, payload))
+        
+        logger.info(f"Video data queued for {video_path}")
+        
+        # The returned data keeps the transcript so downstream stages don't
+        # have to wait for it to be written
+        return {**video_data, 'transcript': transcript}
     
     def get_video_transcript(self, video_id: str) -> List[Dict[str, Any]]:
         """
@@ -187,40 +369,104 @@ class YouTubeChannelCrawler:
             logger.error(f"Error retrieving transcript for video {video_id}: {str(e)}")
             return []
     
-    def crawl_all_videos(self) -> List[Dict[str, Any]]:
+    def iter_videos(self) -> Iterator[Dict[str, Any]]:
         """
-        Crawl all videos from the channel.
+        Crawl all videos from the channel, yielding each as soon as it is available.
         
-        Returns:
-            List of video data dictionaries
+        Recently crawled videos are yielded first, followed by newly crawled
+        videos in completion order. The new videos are crawled in the
+        background while the cached ones are yielded, so the network work
+        overlaps with whatever consumes the cached videos. The videos summary
+        is saved once all videos have been yielded.
+        
+        Yields:
+            Video data dictionaries
         """
         video_urls = self.extract_video_urls()
-        logger.info(f"Starting to crawl {len(video_urls)} videos")
-        
-        video_data_list = []
-        for i, url in enumerate(video_urls):
-            logger.info(f"Processing video {i+1}/{len(video_urls)}: {url}")
-            video_data = self.crawl_video_content(url)
-            if video_data:
-                video_data_list.append(video_data)
+        summary_data = []
+        
+        # Reuse recently crawled videos and only crawl the rest; the cached
+        # paths are kept so each video's data is only looked up once
+        cached_videos = []
+        pending_urls = []
+        for url in video_urls:
+            video_path = self._cached_video_path(url)
+            if video_path:
+                cached_videos.append((url, video_path))
+            else:
+                pending_urls.append(url)
+        
+        logger.info(f"Reusing {len(cached_videos)} cached videos, {len(pending_urls)} videos to crawl")
+        
+        logger.info(f"Starting to crawl {len(pending_urls)} videos with {self.max_workers} workers")
+        
+        # Each video is network-bound and writes to its own directory,
+        # so videos can be crawled concurrently; each crawl fetches its
+        # transcript alongside the watch page
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures: Dict[Future, str] = {executor.submit(self.crawl_video_content, url): url for url in pending_urls}
+        try:
+            for url, video_path in cached_videos:
+                cached_video_data = self._read_cached_video(url, video_path)
+                if cached_video_data:
+                    summary_data.append(self._summary_entry(cached_video_data))
+                    yield cached_video_data
+                else:
+                    # Unreadable cache files are crawled again
+                    futures[executor.submit(self.crawl_video_content, url)] = url
+            
+            for i, future in enumerate(as_completed(futures)):
+                url = futures[future]
+                if i % 10 == 0 or i + 1 == len(futures):
+                    logger.info(f"Processed video {i+1}/{len(futures)}: {url}")
+                try:
+                    video_data = future.result()
+                except Exception as e:
+                    logger.error(f"Error crawling video {url}: {str(e)}")
+                    continue
+                if video_data:
+                    summary_data.append(self._summary_entry(video_data))
+                    yield video_data
+        finally:
+            # Don't start pending crawls if the consumer stopped early
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            
+            # Wait for the writer so every video's files are on disk
+            self.flush_writes()
         
         # Save summary of all videos
         summary_path = os.path.join(self.channel_dir, 'videos_summary.json')
-        summary_data = [
-            {
-                'video_id': data['video_id'],
-                'title': data['title'],
-                'url': data['url'],
-                'has_transcript': bool(data.get('transcript'))
-            }
-            for data in video_data_list
-        ]
-        
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary_data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Crawled {len(video_data_list)} videos, summary saved to {summary_path}")
-        return video_data_list
+        write_json(summary_path, summary_data)
+        
+        logger.info(f"Crawled {len(summary_data)} videos, summary saved to {summary_path}")
+    
+    def _summary_entry(self, video_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the videos summary entry for a video."""
+        if 'transcript' in video_data:
+            has_transcript = bool(video_data['transcript'])
+        else:
+            has_transcript = find_jsonl(
+                f"{self._videos_dir}{os.sep}{video_data['video_id']}{os.sep}transcript.jsonl"
+            ) is not None
+        
+        video_id, title, url = self._summary_fields(video_data)
+        return {
+            'video_id': video_id,
+            'title': title,
+            'url': url,
+            'has_transcript': has_transcript
+        }
+    
+    def crawl_all_videos(self) -> List[Dict[str, Any]]:
+        """
+        Crawl all videos from the channel.
+        
+        Returns:
+            List of video data dictionaries
+        """
+        return list(self.iter_videos())
     
     def crawl_channel(self) -> Dict[str, Any]:
         """
@@ -237,17 +483,29 @@ class YouTubeChannelCrawler:
         # Crawl all videos
         video_data_list = self.crawl_all_videos()
         
+        return self.save_crawl_summary(channel_data, len(video_data_list))
+    
+    def save_crawl_summary(self, channel_data: Dict[str, Any], videos_count: int) -> Dict[str, Any]:
+        """
+        Save the summary of a full channel crawl.
+        
+        Args:
+            channel_data: Channel metadata
+            videos_count: Number of videos crawled
+            
+        Returns:
+            Dictionary with channel metadata and video count
+        """
         # Create full channel data
         full_data = {
             'channel': channel_data,
-            'videos_count': len(video_data_list),
+            'videos_count': videos_count,
             'crawl_date': datetime.now().isoformat()
         }
         
         # Save full crawl summary
         summary_path = os.path.join(self.channel_dir, 'crawl_summary.json')
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(full_data, f, ensure_ascii=False, indent=2)
+        write_json(summary_path, full_data)
         
         logger.info(f"Channel crawl completed, summary saved to {summary_path}")
         return full_data
@@ -10,20 +10,22 @@ import sys
 import json
 import logging
 import argparse
-from typing import Dict, List, Any, Optional
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Optional
 import numpy as np
 from datetime import datetime
 
-from src.interface.query import QueryProcessor
 from src.interface.response import ResponseGenerator
-from src.memory.vector_db import VectorDatabase
+from src.interface.history import HistoryWriter
+from src.interface.semantic_cache import SemanticCache
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+if TYPE_CHECKING:
+    from src.interface.query import QueryProcessor
+    from src.memory.vector_db import VectorDatabase
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class ConversationalCLI:
     """
@@ -41,26 +43,46 @@ class ConversationalCLI:
         self.base_dir = base_dir
         self.channel_name = channel_name
         
-        # Initialize components
-        self.query_processor = QueryProcessor()
+        # Initialize components; the embedding model and vector database are
+        # loaded on first query, so commands that don't query start instantly
+        self._query_processor: Optional['QueryProcessor'] = None
+        self._vector_db: Optional['VectorDatabase'] = None
         self.response_generator = ResponseGenerator()
-        self.vector_db = VectorDatabase(
-            embeddings_dir=os.path.join(base_dir, 'data', 'embeddings'),
-            index_dir=os.path.join(base_dir, 'data', 'index')
-        )
+        self.semantic_cache = SemanticCache()
         
-        # Create history directory
+        # Open history
         self.history_dir = os.path.join(base_dir, 'data', 'history')
-        os.makedirs(self.history_dir, exist_ok=True)
+        self.history = HistoryWriter(self.history_dir, channel_name)
         
         logger.info(f"Initialized conversational CLI for channel {channel_name}")
     
-    def process_query(self, query: str) -> Dict[str, Any]:
+    @property
+    def query_processor(self) -> 'QueryProcessor':
+        """Query processor, created on first use."""
+        if self._query_processor is None:
+            from src.interface.query import QueryProcessor
+            self._query_processor = QueryProcessor()
+        return self._query_processor
+    
+    @property
+    def vector_db(self) -> 'VectorDatabase':
+        """Vector database, created on first use."""
+        if self._vector_db is None:
+            from src.memory.vector_db import VectorDatabase
+            self._vector_db = VectorDatabase(
+                embeddings_dir=os.path.join(self.base_dir, 'data', 'embeddings'),
+                index_dir=os.path.join(self.base_dir, 'data', 'index')
+            )
+        return self._vector_db
+    
+    def process_query(self, query: str, on_line: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Process a query and generate a response.
         
         Args:
             query: Natural language query string
+            on_line: Optional callback receiving each answer line as soon as
+                it is generated
             
         Returns:
             Dictionary with query, response, and sources
@@ -70,18 +92,24 @@ class ConversationalCLI:
         # Process query
         processed_query = self.query_processor.process_query(query)
         
-        # Search vector database
-        search_results = self.vector_db.search(
-            channel_name=self.channel_name,
-            query_embedding=processed_query['embedding'],
-            top_k=10
-        )
-        
-        # Generate response
-        response = self.response_generator.generate_response(
-            query=query,
-            search_results=search_results
-        )
+        # Search vector database, reusing the results of a similar earlier query
+        search_results = self.semantic_cache.get(processed_query['embedding'])
+        if search_results is None:
+            search_results = self.vector_db.search(
+                channel_name=self.channel_name,
+                query_embedding=processed_query['embedding'],
+                top_k=10
+            )
+            self.semantic_cache.put(processed_query['embedding'], search_results)
+        
+        # Generate response, passing lines on as they are generated
+        answer_lines = []
+        sources: List[Dict[str, Any]] = []
+        for line in self.response_generator.generate_response_iter(query, search_results, sources):
+            answer_lines.append(line)
+            if on_line is not None:
+                on_line(line)
+        response = self.response_generator.build_response(query, "\n".join(answer_lines), sources)
         
         # Save to history
         self.save_to_history(query, response)
@@ -96,20 +124,9 @@ class ConversationalCLI:
             query: Original query string
             response: Response dictionary
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        history_file = os.path.join(self.history_dir, f"query_{timestamp}.json")
-        
-        history_data = {
-            'query': query,
-            'response': response,
-            'timestamp': datetime.now().isoformat(),
-            'channel': self.channel_name
-        }
-        
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history_data, f, ensure_ascii=False, indent=2)
+        self.history.write(query, response, datetime.now().isoformat())
         
-        logger.info(f"Saved query and response to {history_file}")
+        logger.info(f"Saved query and response to {self.history.history_path}")
     
     def run_interactive(self) -> None:
         """Run the CLI in interactive mode."""
@@ -127,8 +144,8 @@ class ConversationalCLI:
                 if not query.strip():
                     continue
                 
-                response = self.process_query(query)
-                print("\n" + response['answer'])
+                print()
+                self.process_query(query, on_line=partial(print, flush=True))
                 
             except KeyboardInterrupt:
                 print("\n\nExiting...")
@@ -145,8 +162,8 @@ class ConversationalCLI:
             query: Query string
         """
         try:
-            response = self.process_query(query)
-            print("\n" + response['answer'])
+            print()
+            self.process_query(query, on_line=partial(print, flush=True))
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}", exc_info=True)
             print(f"\nError: {str(e)}")
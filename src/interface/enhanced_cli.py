@@ -10,22 +10,25 @@ import sys
 import json
 import logging
 import argparse
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Optional
 import numpy as np
 from datetime import datetime
 
-from src.interface.query import QueryProcessor
 from src.interface.response import ResponseGenerator
-from src.memory.vector_db import VectorDatabase
+from src.interface.history import HistoryWriter
+from src.interface.semantic_cache import SemanticCache
 from src.utils.config import ConfigManager
 from src.utils.refresh import RefreshManager
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+if TYPE_CHECKING:
+    from src.interface.query import QueryProcessor
+    from src.memory.vector_db import VectorDatabase
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class EnhancedCLI:
     """
@@ -44,53 +47,86 @@ class EnhancedCLI:
         self.channel_name = channel_name
         self.channel_handle = f"@{channel_name}"
         
-        # Initialize components
-        self.query_processor = QueryProcessor()
+        # Initialize components; the embedding model and vector database are
+        # loaded on first query, so commands that don't query start instantly
+        self._query_processor: Optional['QueryProcessor'] = None
+        self._vector_db: Optional['VectorDatabase'] = None
         self.response_generator = ResponseGenerator()
-        self.vector_db = VectorDatabase(
-            embeddings_dir=os.path.join(base_dir, 'data', 'embeddings'),
-            index_dir=os.path.join(base_dir, 'data', 'index')
-        )
+        self.semantic_cache = SemanticCache()
         
         # Initialize refresh manager
         self.refresh_manager = RefreshManager(base_dir)
         
-        # Create history directory
+        # Runs refresh checks alongside query embedding
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        
+        # Open history
         self.history_dir = os.path.join(base_dir, 'data', 'history')
-        os.makedirs(self.history_dir, exist_ok=True)
+        self.history = HistoryWriter(self.history_dir, channel_name)
         
         logger.info(f"Initialized enhanced CLI for channel {channel_name}")
     
-    def process_query(self, query: str) -> Dict[str, Any]:
+    @property
+    def query_processor(self) -> 'QueryProcessor':
+        """Query processor, created on first use."""
+        if self._query_processor is None:
+            from src.interface.query import QueryProcessor
+            self._query_processor = QueryProcessor()
+        return self._query_processor
+    
+    @property
+    def vector_db(self) -> 'VectorDatabase':
+        """Vector database, created on first use."""
+        if self._vector_db is None:
+            from src.memory.vector_db import VectorDatabase
+            self._vector_db = VectorDatabase(
+                embeddings_dir=os.path.join(self.base_dir, 'data', 'embeddings'),
+                index_dir=os.path.join(self.base_dir, 'data', 'index')
+            )
+        return self._vector_db
+    
+    def process_query(self, query: str, on_line: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Process a query and generate a response.
         
         Args:
             query: Natural language query string
+            on_line: Optional callback receiving each answer line as soon as
+                it is generated
             
         Returns:
             Dictionary with query, response, and sources
         """
         logger.info(f"Processing query: {query}")
         
-        # Check for auto refresh
-        self.refresh_manager.check_auto_refresh(self.channel_handle)
+        # Check for auto refresh while the query is embedded; the two are
+        # independent, but the search has to wait for any refresh
+        refresh_future = self._executor.submit(self.refresh_manager.check_auto_refresh, self.channel_handle)
         
         # Process query
         processed_query = self.query_processor.process_query(query)
         
-        # Search vector database
-        search_results = self.vector_db.search(
-            channel_name=self.channel_name,
-            query_embedding=processed_query['embedding'],
-            top_k=10
-        )
+        if refresh_future.result():
+            self.semantic_cache.clear()
         
-        # Generate response
-        response = self.response_generator.generate_response(
-            query=query,
-            search_results=search_results
-        )
+        # Search vector database, reusing the results of a similar earlier query
+        search_results = self.semantic_cache.get(processed_query['embedding'])
+        if search_results is None:
+            search_results = self.vector_db.search(
+                channel_name=self.channel_name,
+                query_embedding=processed_query['embedding'],
+                top_k=10
+            )
+            self.semantic_cache.put(processed_query['embedding'], search_results)
+        
+        # Generate response, passing lines on as they are generated
+        answer_lines = []
+        sources: List[Dict[str, Any]] = []
+        for line in self.response_generator.generate_response_iter(query, search_results, sources):
+            answer_lines.append(line)
+            if on_line is not None:
+                on_line(line)
+        response = self.response_generator.build_response(query, "\n".join(answer_lines), sources)
         
         # Save to history
         self.save_to_history(query, response)
@@ -105,20 +141,9 @@ class EnhancedCLI:
             query: Original query string
             response: Response dictionary
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        history_file = os.path.join(self.history_dir, f"query_{timestamp}.json")
-        
-        history_data = {
-            'query': query,
-            'response': response,
-            'timestamp': datetime.now().isoformat(),
-            'channel': self.channel_name
-        }
+        self.history.write(query, response, datetime.now().isoformat())
         
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history_data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Saved query and response to {history_file}")
+        logger.info(f"Saved query and response to {self.history.history_path}")
     
     def toggle_refresh_mode(self) -> str:
         """
@@ -145,7 +170,10 @@ class EnhancedCLI:
         Returns:
             Boolean indicating success
         """
-        return self.refresh_manager.refresh_channel(self.channel_handle)
+        success = self.refresh_manager.refresh_channel(self.channel_handle)
+        if success:
+            self.semantic_cache.clear()
+        return success
     
     def print_refresh_status(self) -> None:
         """Print current refresh status."""
@@ -216,8 +244,8 @@ class EnhancedCLI:
                     continue
                 
                 # Process regular query
-                response = self.process_query(user_input)
-                print("\n" + response['answer'])
+                print()
+                self.process_query(user_input, on_line=partial(print, flush=True))
                 
             except KeyboardInterrupt:
                 print("\n\nExiting...")
@@ -234,12 +262,9 @@ class EnhancedCLI:
             query: Query string
         """
         try:
-            # Check for auto refresh
-            self.refresh_manager.check_auto_refresh(self.channel_handle)
-            
-            # Process query
-            response = self.process_query(query)
-            print("\n" + response['answer'])
+            # Process query; it checks for auto refresh while embedding the query
+            print()
+            self.process_query(query, on_line=partial(print, flush=True))
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}", exc_info=True)
             print(f"\nError: {str(e)}")
@@ -0,0 +1,266 @@
+"""
+Query History Module
+
+This module appends query and response records to a newline-delimited JSON
+history file, flushing to disk in batches.
+
+Queries, answers and source fields repeat a lot across sessions, so they are
+stored once in a string table (strings.jsonl, one string per line) and
+history records refer to them by line number. Several sessions may append to
+the same channel history, so IDs are assigned at flush time while holding an
+exclusive lock on the string table, after reading the strings other sessions
+appended since.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.json_utils import dumps, loads
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; sessions are not locked out
+    fcntl = None
+
+# Logging is configured by the application, not by this module
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Response and source fields stored in the string table
+_RESPONSE_KEYS = ('query', 'answer')
+_SOURCE_KEYS = ('video_id', 'video_title', 'video_url', 'timestamp_url', 'text')
+
+def _write_all(f: BinaryIO, data: bytes) -> None:
+    """Write all of data to an unbuffered file, which may write less per call."""
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+class HistoryWriter:
+    """
+    Appends history records of a channel to history.jsonl in its history directory.
+    """
+    
+    def __init__(self, history_dir: str, channel_name: str, flush_interval: float = 1.0):
+        """
+        Initialize the history writer.
+        
+        Args:
+            history_dir: Directory to save history in
+            channel_name: Name of the channel (without @ symbol)
+            flush_interval: Minimum number of seconds between flushes
+        """
+        self.channel_name = channel_name
+        self.flush_interval = flush_interval
+        
+        self.history_dir = os.path.join(history_dir, channel_name)
+        os.makedirs(self.history_dir, exist_ok=True)
+        self.history_path = os.path.join(self.history_dir, 'history.jsonl')
+        self.strings_path = os.path.join(self.history_dir, 'strings.jsonl')
+        
+        # String table, shared by all sessions of the channel; it is read
+        # from disk up to _strings_offset and extended by _sync_strings
+        self._strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+        self._strings_offset = 0
+        
+        # Unbuffered append handles, kept open between flushes
+        self._strings_file: Optional[BinaryIO] = None
+        self._history_file: Optional[BinaryIO] = None
+        
+        # Records not yet written; they are encoded when flushed, so their
+        # string IDs account for the strings other sessions appended
+        self._pending_records: List[Tuple[str, Dict[str, Any], str]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        
+        # Buffered records are written when the interpreter exits
+        atexit.register(self.close)
+    
+    def _open(self) -> None:
+        """Open the append handles if they are closed; the caller holds the lock."""
+        if self._strings_file is None:
+            self._strings_file = open(self.strings_path, 'a+b', buffering=0)
+        if self._history_file is None:
+            self._history_file = open(self.history_path, 'ab', buffering=0)
+    
+    def _lock_strings(self, exclusive: bool) -> None:
+        """Lock the string table against other sessions and read their new strings."""
+        if fcntl is not None:
+            fcntl.flock(self._strings_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._sync_strings()
+    
+    def _unlock_strings(self) -> None:
+        """Release the lock taken by _lock_strings."""
+        if fcntl is not None:
+            fcntl.flock(self._strings_file, fcntl.LOCK_UN)
+    
+    def _sync_strings(self) -> None:
+        """Read the strings appended to the string table since it was last read."""
+        self._strings_file.seek(self._strings_offset)
+        data = self._strings_file.read()
+        # Only whole lines are read, in case a session without locking is mid-write
+        data = data[:data.rfind(b'\n') + 1]
+        for line in data.splitlines():
+            string = loads(line)
+            self._string_index.setdefault(string, len(self._strings))
+            self._strings.append(string)
+        self._strings_offset += len(data)
+    
+    def _intern(self, string: str, new_strings: Dict[str, int]) -> int:
+        """
+        Get the string table ID of a string. New strings are added to
+        new_strings, and only to the table once they are written.
+        """
+        string_id = self._string_index.get(string)
+        if string_id is None:
+            string_id = new_strings.get(string)
+            if string_id is None:
+                string_id = new_strings[string] = len(self._strings) + len(new_strings)
+        return string_id
+    
+    def _encode_response(self, response: Dict[str, Any], new_strings: Dict[str, int]) -> Dict[str, Any]:
+        """Replace the repetitive strings of a response by string table IDs."""
+        encoded = dict(response)
+        for key in _RESPONSE_KEYS:
+            if isinstance(encoded.get(key), str):
+                encoded[key] = self._intern(encoded[key], new_strings)
+        
+        sources = []
+        for source in response.get('sources', []):
+            source = dict(source)
+            for key in _SOURCE_KEYS:
+                if isinstance(source.get(key), str):
+                    source[key] = self._intern(source[key], new_strings)
+            sources.append(source)
+        encoded['sources'] = sources
+        
+        return encoded
+    
+    def _decode_response(self, encoded: Dict[str, Any]) -> Dict[str, Any]:
+        """Restore the strings of a response encoded by _encode_response."""
+        response = dict(encoded)
+        for key in _RESPONSE_KEYS:
+            if isinstance(response.get(key), int):
+                response[key] = self._strings[response[key]]
+        
+        sources = []
+        for source in encoded.get('sources', []):
+            source = dict(source)
+            for key in _SOURCE_KEYS:
+                if isinstance(source.get(key), int):
+                    source[key] = self._strings[source[key]]
+            sources.append(source)
+        response['sources'] = sources
+        
+        return response
+    
+    def write(self, query: str, response: Dict[str, Any], timestamp: str) -> None:
+        """
+        Append a query and its response to the history.
+        
+        Args:
+            query: Original query string
+            response: Response dictionary
+            timestamp: ISO format time of the query
+        """
+        with self._lock:
+            self._pending_records.append((query, response, timestamp))
+            
+            if time.monotonic() - self._last_flush > self.flush_interval:
+                self._flush()
+    
+    def _flush(self) -> None:
+        """Write pending records to disk; the caller holds the lock."""
+        if self._pending_records:
+            self._open()
+            self._lock_strings(exclusive=True)
+            try:
+                new_strings: Dict[str, int] = {}
+                lines = []
+                for query, response, timestamp in self._pending_records:
+                    record = {
+                        'query': self._intern(query, new_strings),
+                        'response': self._encode_response(response, new_strings),
+                        'timestamp': timestamp,
+                        'channel': self.channel_name
+                    }
+                    lines.append(dumps(record) + b'\n')
+                
+                # New strings are always written before the records that refer
+                # to them. If either write fails, both files are cut back to
+                # their previous ends, so disk and memory still agree and the
+                # records are retried by the next flush.
+                strings_data = b''.join(dumps(string) + b'\n' for string in new_strings)
+                history_size = os.fstat(self._history_file.fileno()).st_size
+                try:
+                    _write_all(self._strings_file, strings_data)
+                    _write_all(self._history_file, b''.join(lines))
+                except OSError:
+                    os.ftruncate(self._strings_file.fileno(), self._strings_offset)
+                    os.ftruncate(self._history_file.fileno(), history_size)
+                    raise
+                
+                for string, string_id in new_strings.items():
+                    self._string_index[string] = string_id
+                    self._strings.append(string)
+                self._strings_offset += len(strings_data)
+                self._pending_records.clear()
+            finally:
+                self._unlock_strings()
+        
+        self._last_flush = time.monotonic()
+    
+    def flush(self) -> None:
+        """Write buffered records to disk."""
+        with self._lock:
+            self._flush()
+    
+    def close(self) -> None:
+        """Flush buffered records and close the files; the writer can still be used afterwards."""
+        with self._lock:
+            self._flush()
+            for f in (self._strings_file, self._history_file):
+                if f is not None:
+                    f.close()
+            self._strings_file = self._history_file = None
+    
+    def iter_history(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the history of the channel, oldest first.
+        
+        Yields:
+            History records with query and response strings restored
+        """
+        with self._lock:
+            self._flush()
+            self._open()
+            # Records are only read up to the history size seen under the
+            # lock, since those refer only to strings read by then
+            self._lock_strings(exclusive=False)
+            try:
+                history_size = os.path.getsize(self.history_path)
+            finally:
+                self._unlock_strings()
+        
+        for record in self._iter_records(history_size):
+            yield {
+                'query': self._strings[record['query']],
+                'response': self._decode_response(record['response']),
+                'timestamp': record['timestamp'],
+                'channel': record['channel']
+            }
+    
+    def _iter_records(self, size: int) -> Iterator[Dict[str, Any]]:
+        """Iterate over the encoded records in the first size bytes of the history."""
+        offset = 0
+        with open(self.history_path, 'rb') as f:
+            for line in f:
+                offset += len(line)
+                if offset > size:
+                    break
+                yield loads(line)
@@ -5,19 +5,16 @@ This module processes natural language queries and transforms them
 into semantic search queries for the vector database.
 """
 
-import os
-import json
 import logging
 import numpy as np
-from typing import Dict, List, Any, Optional
-from sentence_transformers import SentenceTransformer
+from functools import lru_cache
+from typing import Dict, List, Any
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.semantic.models import get_model
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class QueryProcessor:
     """
@@ -33,12 +30,35 @@ class QueryProcessor:
         """
         self.model_name = model_name
         
-        # Load embedding model
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        # Load embedding model, shared with the embedder and other query processors
+        self.model = get_model(model_name)
+        
+        # Embeddings of recently seen queries
+        self._encode_cached = lru_cache(maxsize=2048)(self._encode)
         
         logger.info(f"Initialized query processor with model {model_name}")
     
+    def _encode(self, text: str) -> np.ndarray:
+        """Generate the normalized embedding of a single query."""
+        embedding = self.model.encode(text, normalize_embeddings=True)
+        # Cached embeddings are shared between callers
+        embedding.flags.writeable = False
+        return embedding
+    
+    def _build_query(self, query: str, clean_query: str, embedding: np.ndarray) -> Dict[str, Any]:
+        """Assemble the processed query information."""
+        # Extract potential entities or keywords
+        # This is a simple implementation; could be enhanced with NLP techniques
+        keywords = [word for word in clean_query.split() if len(word) > 3]
+        
+        return {
+            'original_query': query,
+            'clean_query': clean_query,
+            'embedding': embedding,
+            'keywords': keywords,
+            'embedding_model': self.model_name
+        }
+    
     def process_query(self, query: str) -> Dict[str, Any]:
         """
         Process a natural language query.
@@ -52,17 +72,32 @@ class QueryProcessor:
         # Clean query
         clean_query = query.strip()
         
-        # Generate embedding
-        embedding = self.model.encode(clean_query)
+        # Generate normalized embedding, matching the cosine similarity index
+        embedding = self._encode_cached(clean_query)
         
-        # Extract potential entities or keywords
-        # This is a simple implementation; could be enhanced with NLP techniques
-        keywords = [word for word in clean_query.split() if len(word) > 3]
+        return self._build_query(query, clean_query, embedding)
+    
+    def process_queries(self, queries: List[str], batch_size: int = 32) -> List[Dict[str, Any]]:
+        """
+        Process many natural language queries in batched model calls.
         
-        return {
-            'original_query': query,
-            'clean_query': clean_query,
-            'embedding': embedding,
-            'keywords': keywords,
-            'embedding_model': self.model_name
-        }
+        Args:
+            queries: Natural language query strings
+            batch_size: Number of queries encoded per forward pass
+            
+        Returns:
+            List of dictionaries with processed query information
+        """
+        clean_queries = [query.strip() for query in queries]
+        
+        embeddings = self.model.encode(
+            clean_queries,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        
+        return [
+            self._build_query(query, clean_query, embedding)
+            for query, clean_query, embedding in zip(queries, clean_queries, embeddings)
+        ]
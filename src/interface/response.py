@@ -8,15 +8,23 @@ based on search results from the vector database.
 import os
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from typing import Dict, Iterator, List, Any, Optional
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+def _score(result: Dict[str, Any]) -> float:
+    """Get the score of a search result."""
+    return result.get('score', 0)
+
+@lru_cache(maxsize=4096)
+def _format_timestamp(seconds: int) -> str:
+    """Format whole seconds as MM:SS."""
+    minutes, remaining_seconds = divmod(seconds, 60)
+    return f"{minutes}:{remaining_seconds:02d}"
 
 class ResponseGenerator:
     """
@@ -37,9 +45,7 @@ class ResponseGenerator:
         Returns:
             Formatted timestamp string (MM:SS)
         """
-        minutes = int(seconds // 60)
-        remaining_seconds = int(seconds % 60)
-        return f"{minutes}:{remaining_seconds:02d}"
+        return _format_timestamp(int(seconds))
     
     def generate_response(self, query: str, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -52,18 +58,70 @@ class ResponseGenerator:
         Returns:
             Dictionary with generated response
         """
+        sources: List[Dict[str, Any]] = []
+        answer = "\n".join(self.generate_response_iter(query, search_results, sources))
+        return self.build_response(query, answer, sources)
+    
+    def build_response(self, query: str, answer: str, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Assemble a response dictionary from a generated answer.
+        
+        Args:
+            query: Original query string
+            answer: Answer text
+            sources: Sources referenced by the answer
+            
+        Returns:
+            Dictionary with generated response
+        """
+        return {
+            'query': query,
+            'answer': answer,
+            'sources': sources,
+            'has_sources': bool(sources),
+            'generation_date': datetime.now().isoformat()
+        }
+    
+    def generate_response_iter(self, query: str, search_results: List[Dict[str, Any]],
+                               sources: Optional[List[Dict[str, Any]]] = None) -> Iterator[str]:
+        """
+        Generate a source-referenced answer line by line.
+        
+        Lines are yielded as soon as they are formatted, so callers can show
+        the start of the answer before the sources are done.
+        
+        Args:
+            query: Original query string
+            search_results: List of search results from vector database
+            sources: Optional list the referenced sources are appended to
+            
+        Yields:
+            Lines of the answer
+        """
+        if sources is None:
+            sources = []
+        
         if not search_results:
-            return {
-                'query': query,
-                'answer': "I couldn't find any relevant information about that topic in the channel's content.",
-                'sources': [],
-                'has_sources': False,
-                'generation_date': datetime.now().isoformat()
-            }
+            yield "I couldn't find any relevant information about that topic in the channel's content."
+            return
+        
+        yield f"Based on the content from the YouTube channel, here's what I found about '{query}':"
+        yield ""
+        
+        # Rank results once; grouping in rank order leaves videos ordered by
+        # their highest scoring chunk and each video's chunks ranked
+        ranked_results = sorted(search_results, key=_score, reverse=True)
+        
+        # Add summary from top results
+        for chunk in ranked_results[:3]:
+            yield chunk.get('text', '')
+        
+        yield ""
+        yield "Here are the specific sources:"
         
         # Group results by video
         videos = {}
-        for result in search_results:
+        for result in ranked_results:
             video_id = result.get('video_id')
             if video_id not in videos:
                 videos[video_id] = {
@@ -74,31 +132,9 @@ class ResponseGenerator:
                 }
             videos[video_id]['chunks'].append(result)
         
-        # Sort videos by highest scoring chunk
-        sorted_videos = sorted(
-            videos.values(),
-            key=lambda v: max(chunk.get('score', 0) for chunk in v['chunks']),
-            reverse=True
-        )
-        
-        # Generate answer
-        answer_parts = []
-        answer_parts.append(f"Based on the content from the YouTube channel, here's what I found about '{query}':")
-        answer_parts.append("")
-        
-        # Add summary from top results
-        top_chunks = sorted(search_results, key=lambda x: x.get('score', 0), reverse=True)[:3]
-        for chunk in top_chunks:
-            answer_parts.append(chunk.get('text', ''))
-        
-        answer_parts.append("")
-        answer_parts.append("Here are the specific sources:")
-        
         # Format sources
-        sources = []
-        for video in sorted_videos[:3]:  # Limit to top 3 videos
-            video_sources = []
-            for chunk in sorted(video['chunks'], key=lambda x: x.get('score', 0), reverse=True)[:2]:  # Top 2 chunks per video
+        for video in list(videos.values())[:3]:  # Limit to top 3 videos
+            for chunk in video['chunks'][:2]:  # Top 2 chunks per video
                 timestamp = self.format_timestamp(chunk.get('start_time', 0))
                 source = {
                     'video_id': video['video_id'],
@@ -108,26 +144,12 @@ class ResponseGenerator:
                     'timestamp_url': chunk.get('timestamp_url', video['url']),
                     'text': chunk.get('text', '')[:150] + "..."  # Truncate for brevity
                 }
-                video_sources.append(source)
+                sources.append(source)
                 
                 # Add to answer
-                source_text = f"- {video['title']} at {timestamp}: {source['text']}"
-                answer_parts.append(source_text)
-                answer_parts.append(f"  Link: {source['timestamp_url']}")
-                answer_parts.append("")
-            
-            sources.extend(video_sources)
+                yield f"- {video['title']} at {timestamp}: {source['text']}"
+                yield f"  Link: {source['timestamp_url']}"
+                yield ""
         
         # Add follow-up suggestions
-        answer_parts.append("Would you like more specific information about any of these points?")
-        
-        # Combine answer parts
-        answer = "\n".join(answer_parts)
-        
-        return {
-            'query': query,
-            'answer': answer,
-            'sources': sources,
-            'has_sources': bool(sources),
-            'generation_date': datetime.now().isoformat()
-        }
+        yield "Would you like more specific information about any of these points?"
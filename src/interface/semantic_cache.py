@@ -0,0 +1,109 @@
+"""
+Semantic Cache Module
+
+This module caches search results by query embedding, so that repeated or
+rephrased queries can skip the vector database search.
+"""
+
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Logging is configured by the application, not by this module
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+class SemanticCache:
+    """
+    LRU cache keyed by normalized query embeddings.
+    
+    A lookup hits when a cached embedding has a cosine similarity of at
+    least the threshold with the query embedding. The cache can be shared by
+    threads processing queries concurrently.
+    """
+    
+    def __init__(self, max_entries: int = 256, threshold: float = 0.95):
+        """
+        Initialize the semantic cache.
+        
+        Args:
+            max_entries: Maximum number of cached queries
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        
+        # Cached values by entry ID, least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._next_id = 0
+        
+        # Stacked embeddings of the cached entries, rebuilt on change
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: list = []
+        
+        self._lock = threading.Lock()
+    
+    def _normalize(self, embedding: Any) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, embedding: Any) -> Optional[Any]:
+        """
+        Get the value cached for a similar query embedding.
+        
+        Args:
+            embedding: Query embedding
+            
+        Returns:
+            Cached value of the most similar query, or None on a miss
+        """
+        query = self._normalize(embedding)
+        
+        with self._lock:
+            if not self._entries:
+                return None
+            
+            if self._matrix is None:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.stack([self._entries[entry_id][0] for entry_id in self._matrix_ids])
+            
+            similarities = self._matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            
+            entry_id = self._matrix_ids[best]
+            self._entries.move_to_end(entry_id)
+            value = self._entries[entry_id][1]
+        
+        logger.info(f"Semantic cache hit (similarity {similarities[best]:.3f})")
+        return value
+    
+    def put(self, embedding: Any, value: Any) -> None:
+        """
+        Cache a value for a query embedding.
+        
+        Args:
+            embedding: Query embedding
+            value: Value to cache
+        """
+        vector = self._normalize(embedding)
+        
+        with self._lock:
+            self._entries[self._next_id] = (vector, value)
+            self._next_id += 1
+            
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            
+            self._matrix = None
+    
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
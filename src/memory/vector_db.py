@@ -2,29 +2,111 @@
 Vector Database Module
 
 This module implements a vector database for storing and searching embeddings.
-It uses FAISS for efficient similarity search.
+It uses FAISS for efficient similarity search. Without FAISS, channels are
+searched exactly with SimSIMD (or NumPy) similarity kernels.
 """
 
 import os
-import json
+import mmap
 import logging
 import numpy as np
-import faiss
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from itertools import islice
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.utils.json_utils import loads, read_json, write_json
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Chunk fields returned with search results
+_RESULT_KEYS = ('video_id', 'video_title', 'video_url', 'text', 'start_time', 'timestamp_url')
+
+def _normalize_rows(vectors: np.ndarray) -> None:
+    """L2-normalize the rows of a float32 matrix in place."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, np.finfo(np.float32).tiny)
+
+def _quantize_rows(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize the rows of a float32 matrix to int8 codes with one scale per row,
+    so that row i is approximately codes[i] * scales[i].
+    """
+    scales = np.maximum(np.abs(vectors).max(axis=1) / 127, np.finfo(np.float32).tiny).astype(np.float32)
+    codes = np.rint(vectors / scales[:, np.newaxis]).astype(np.int8)
+    return codes, scales
+
+def _similarities(matrix: np.ndarray, query: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Cosine similarities between a normalized query and normalized matrix rows.
+    
+    The matrix is either float32 or, only when SimSIMD is installed, int8
+    codes with per-row scales (see _quantize_rows). Uses SimSIMD, which picks
+    the best SIMD kernel for the CPU at runtime (including int8 dot product
+    instructions), when it is installed.
+    """
+    if simsimd is not None:
+        if scales is not None:
+            # Cosine distance ignores the scales, so codes are compared directly
+            query, _ = _quantize_rows(query[np.newaxis])
+            query = query[0]
+        distances = np.asarray(simsimd.cdist(query[np.newaxis], matrix, metric='cosine'))
+        return 1.0 - distances[0]
+    return matrix @ query
+
+class ChunkStore:
+    """
+    Read-only sequence of chunks backed by a memory-mapped JSONL file.
+    
+    Chunks are parsed on access, using the byte offsets saved alongside the file.
+    """
+    
+    def __init__(self, chunks_path: str, offsets_path: str):
+        """
+        Open a chunk store.
+        
+        Args:
+            chunks_path: Path of the chunks JSONL file
+            offsets_path: Path of the line offsets (one more than the chunk count)
+        """
+        self.offsets = np.load(offsets_path)
+        with open(chunks_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        return loads(self._mm[self.offsets[idx]:self.offsets[idx + 1]])
 
 class VectorDatabase:
     """
     Vector database for storing and searching embeddings.
     """
     
+    # HNSW graph parameters: neighbors per node and build/search beam widths
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64
+    
+    # Channels with at least this many chunks use a compressed IVF-PQ index
+    IVFPQ_MIN_VECTORS = 1_000_000
+    
+    # Channels with fewer chunks are searched exactly with a matrix product,
+    # which is faster than the FAISS call overhead at this size
+    EXACT_SEARCH_MAX_VECTORS = 50_000
+    
     def __init__(self, embeddings_dir: str, index_dir: str):
         """
         Initialize the vector database.
@@ -39,12 +121,20 @@ class VectorDatabase:
         # Create index directory if it doesn't exist
         os.makedirs(self.index_dir, exist_ok=True)
         
+        # Loaded index, chunks, exact search matrix and its row scales, and
+        # index file mtime per channel
+        self._index_cache: Dict[str, Tuple[Any, Sequence[Dict[str, Any]], Optional[np.ndarray],
+                                           Optional[np.ndarray], float]] = {}
+        
         logger.info(f"Initialized vector database")
     
     def build_index(self, channel_name: str) -> bool:
         """
         Build a FAISS index for a channel.
         
+        If the channel's embeddings were only appended to since the index was
+        last built, the new embeddings are added to the existing index.
+        
         Args:
             channel_name: Name of the channel (without @ symbol)
             
@@ -53,119 +143,278 @@ class VectorDatabase:
         """
         # Define paths
         channel_embeddings_dir = os.path.join(self.embeddings_dir, channel_name)
+        embeddings_path = os.path.join(channel_embeddings_dir, 'embeddings.npy')
+        embedded_chunks_path = os.path.join(channel_embeddings_dir, 'chunks.jsonl')
+        embeddings_manifest_path = os.path.join(channel_embeddings_dir, 'embeddings_manifest.json')
+        
+        channel_index_dir = os.path.join(self.index_dir, channel_name)
+        index_path = os.path.join(channel_index_dir, 'faiss_index.bin')
+        chunks_path = os.path.join(channel_index_dir, 'chunks.jsonl')
+        offsets_path = os.path.join(channel_index_dir, 'chunks_offsets.npy')
+        matrix_path = os.path.join(channel_index_dir, 'embeddings.npy')
+        scales_path = os.path.join(channel_index_dir, 'embeddings_scales.npy')
+        manifest_path = os.path.join(channel_index_dir, 'index_manifest.json')
         
         # Check if embeddings exist
-        if not os.path.exists(channel_embeddings_dir):
+        if not os.path.exists(embeddings_path) or not os.path.exists(embedded_chunks_path):
             logger.warning(f"Embeddings not found for channel {channel_name}")
             return False
         
-        # Get list of embedding files
-        embedding_files = []
-        for filename in os.listdir(channel_embeddings_dir):
-            if filename.endswith('_embeddings.json') and not filename.startswith('embedded_videos_summary'):
-                embedding_files.append(os.path.join(channel_embeddings_dir, filename))
+        all_embeddings = np.load(embeddings_path, mmap_mode='r')
+        total = len(all_embeddings)
         
-        if not embedding_files:
-            logger.warning(f"No embedding files found for channel {channel_name}")
+        if not total:
+            logger.warning(f"No chunks found in embeddings for channel {channel_name}")
             return False
         
-        logger.info(f"Building index for channel {channel_name} with {len(embedding_files)} embedding files")
+        # Rows already in the index, if it was built from the same embeddings
+        start = 0
+        existing_index = None
+        offsets = np.zeros(1, dtype=np.int64)
+        embeddings_id = read_json(embeddings_manifest_path)['id'] if os.path.exists(embeddings_manifest_path) else None
+        if (faiss is not None and embeddings_id is not None
+                and all(map(os.path.exists, (index_path, chunks_path, offsets_path, manifest_path)))):
+            manifest = read_json(manifest_path)
+            if manifest.get('embeddings_id') == embeddings_id and manifest.get('rows', 0) <= total:
+                existing_index = faiss.read_index(index_path)
+                existing_offsets = np.load(offsets_path)
+                # Only trust the index if it wasn't left half-updated
+                if existing_index.ntotal == manifest['rows'] and len(existing_offsets) == manifest['rows'] + 1:
+                    start = manifest['rows']
+                    offsets = existing_offsets
         
-        # Load all embeddings
-        all_chunks = []
-        for embedding_file in embedding_files:
-            with open(embedding_file, 'r', encoding='utf-8') as f:
-                chunks = json.load(f)
-                all_chunks.extend(chunks)
+        if start == total:
+            logger.info(f"Index for channel {channel_name} is up to date with {total} chunks")
+            return True
         
-        if not all_chunks:
-            logger.warning(f"No chunks found in embedding files for channel {channel_name}")
+        # Chunk lines are copied as is; they are only parsed when searched
+        with open(embedded_chunks_path, 'rb') as f:
+            new_lines = list(islice(f, start, None))
+        
+        if start + len(new_lines) != total:
+            logger.warning(f"Embeddings and chunks don't match for channel {channel_name}")
             return False
         
-        logger.info(f"Loaded {len(all_chunks)} chunks for indexing")
+        if start:
+            logger.info(f"Adding {total - start} chunks to the index for channel {channel_name}")
+        else:
+            logger.info(f"Building index for channel {channel_name} with {total} chunks")
         
-        # Extract embeddings
-        embeddings = np.array([chunk['embedding'] for chunk in all_chunks], dtype=np.float32)
+        # Load embeddings; copied out of the memory map since they are
+        # normalized in place
+        embeddings = np.array(all_embeddings[start:], dtype=np.float32)
         
         # Get embedding dimension
         dimension = embeddings.shape[1]
         
-        # Create FAISS index
-        index = faiss.IndexFlatL2(dimension)
+        # Normalize embeddings so inner product search scores by cosine similarity
+        _normalize_rows(embeddings)
         
-        # Add embeddings to index
-        index.add(embeddings)
+        # Create FAISS index, or extend the existing one, unless FAISS isn't installed
+        index = None
+        if faiss is not None:
+            index = existing_index if start else self._create_index(embeddings)
+            
+            # Add embeddings to index
+            index.add(embeddings)
         
         # Create index directory for channel if it doesn't exist
-        channel_index_dir = os.path.join(self.index_dir, channel_name)
         os.makedirs(channel_index_dir, exist_ok=True)
         
-        # Save index
-        index_path = os.path.join(channel_index_dir, 'faiss_index.bin')
-        faiss.write_index(index, index_path)
+        # Save chunks one per line, with the byte offset of each line so
+        # searches only parse the chunks they return. Appending or swapping
+        # in a new file keeps memory maps of the previous file valid.
+        line_ends = np.cumsum([len(line) for line in new_lines], dtype=np.int64)
+        if start:
+            with open(chunks_path, 'ab') as f:
+                f.writelines(new_lines)
+        else:
+            tmp_path = chunks_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.writelines(new_lines)
+            os.replace(tmp_path, chunks_path)
+        np.save(offsets_path, np.concatenate([offsets, offsets[-1] + line_ends]))
+        
+        # Save the normalized embeddings of small channels (of all channels
+        # without FAISS) for exact search. With SimSIMD they are saved as int8
+        # codes with per-row scales, a quarter of the size (and memory
+        # bandwidth) of float32; NumPy has no fast int8 matrix product, so
+        # they stay float32 otherwise. The scales are saved first, since the
+        # matrix marks the index as updated without FAISS.
+        if index is None or total < self.EXACT_SEARCH_MAX_VECTORS:
+            matrix = np.array(all_embeddings, dtype=np.float32)
+            _normalize_rows(matrix)
+            if simsimd is not None:
+                matrix, scales = _quantize_rows(matrix)
+                np.save(scales_path, scales)
+            elif os.path.exists(scales_path):
+                os.remove(scales_path)
+            np.save(matrix_path, matrix)
+            del matrix
+        else:
+            for path in (matrix_path, scales_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        # Save index last; its mtime marks the index as updated
+        if index is not None:
+            faiss.write_index(index, index_path)
+        self._index_cache.pop(channel_name, None)
         
         # Save metadata
         metadata = {
             'channel_name': channel_name,
-            'chunks_count': len(all_chunks),
+            'chunks_count': total,
             'dimension': dimension,
             'index_date': datetime.now().isoformat()
         }
         
         metadata_path = os.path.join(channel_index_dir, 'index_metadata.json')
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        write_json(metadata_path, metadata, indent=False)
+        write_json(manifest_path, {'embeddings_id': embeddings_id, 'rows': total}, indent=False)
         
-        # Save chunks without embeddings
-        chunks_without_embeddings = []
-        for chunk in all_chunks:
-            chunk_copy = chunk.copy()
-            chunk_copy.pop('embedding', None)
-            chunks_without_embeddings.append(chunk_copy)
+        logger.info(f"Built index for channel {channel_name}, saved to {channel_index_dir}")
         
-        chunks_path = os.path.join(channel_index_dir, 'chunks.json')
-        with open(chunks_path, 'w', encoding='utf-8') as f:
-            json.dump(chunks_without_embeddings, f, ensure_ascii=False, indent=2)
+        return True
+    
+    def _create_index(self, embeddings: np.ndarray) -> Any:
+        """
+        Create an approximate nearest neighbor index suited to the embeddings.
+        
+        Args:
+            embeddings: Embeddings matrix the index will hold
+            
+        Returns:
+            Empty, trained inner product FAISS index
+        """
+        count, dimension = embeddings.shape
         
-        logger.info(f"Built index for channel {channel_name}, saved to {index_path}")
-        logger.info(f"Saved {len(chunks_without_embeddings)} chunks without embeddings to {chunks_path}")
+        if count < self.IVFPQ_MIN_VECTORS:
+            # Vectors are stored as 8-bit scalar quantized codes, a quarter of
+            # the memory (and bandwidth) of float32
+            index = faiss.IndexHNSWSQ(
+                dimension, faiss.ScalarQuantizer.QT_8bit, self.HNSW_M, faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = self.HNSW_EF_CONSTRUCTION
+            index.train(embeddings)
+            return index
         
-        return True
+        # Product quantization needs a subquantizer count dividing the dimension
+        m = dimension // 4
+        while dimension % m:
+            m -= 1
+        nlist = 4 * int(np.sqrt(count))
+        
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        logger.info(f"Training IVF-PQ index with {nlist} lists on {count} embeddings")
+        index.train(embeddings)
+        
+        return index
     
-    def search(self, channel_name: str, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
+    def _load_index(self, channel_name: str) -> Optional[Tuple[Any, Sequence[Dict[str, Any]],
+                                                               Optional[np.ndarray], Optional[np.ndarray]]]:
         """
-        Search the index for similar chunks.
+        Load the index and chunks for a channel, reusing them across searches.
+        
+        The cached copy is reloaded when the index file changes on disk.
         
         Args:
             channel_name: Name of the channel (without @ symbol)
-            query_embedding: Query embedding
-            top_k: Number of results to return
             
         Returns:
-            List of search results
+            Tuple of FAISS index, chunks, the normalized embeddings matrix
+            (None unless the channel is small enough for exact search) and
+            its row scales (None unless the matrix is int8 quantized for
+            SimSIMD), or None if the index doesn't exist
         """
         # Define paths
         channel_index_dir = os.path.join(self.index_dir, channel_name)
         index_path = os.path.join(channel_index_dir, 'faiss_index.bin')
-        chunks_path = os.path.join(channel_index_dir, 'chunks.json')
+        chunks_path = os.path.join(channel_index_dir, 'chunks.jsonl')
+        offsets_path = os.path.join(channel_index_dir, 'chunks_offsets.npy')
+        matrix_path = os.path.join(channel_index_dir, 'embeddings.npy')
+        scales_path = os.path.join(channel_index_dir, 'embeddings_scales.npy')
+        legacy_chunks_path = os.path.join(channel_index_dir, 'chunks.json')
         
-        # Check if index exists
-        if not os.path.exists(index_path) or not os.path.exists(chunks_path):
+        # Check if index exists; without FAISS the exact search matrix is the index
+        stamp_path = index_path if faiss is not None else matrix_path
+        try:
+            mtime = os.path.getmtime(stamp_path)
+        except OSError:
+            mtime = None
+        has_chunks = os.path.exists(chunks_path) and os.path.exists(offsets_path)
+        if mtime is None or not (has_chunks or os.path.exists(legacy_chunks_path)):
             logger.warning(f"Index or chunks not found for channel {channel_name}")
-            return []
+            return None
+        
+        cached = self._index_cache.get(channel_name)
+        if cached is not None and cached[4] == mtime:
+            return cached[:4]
         
         # Load index
-        index = faiss.read_index(index_path)
+        index = faiss.read_index(index_path) if faiss is not None else None
         
-        # Load chunks
-        with open(chunks_path, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
+        # Load chunks; indices built before chunks.jsonl are read whole
+        if has_chunks:
+            chunks = ChunkStore(chunks_path, offsets_path)
+        else:
+            chunks = read_json(legacy_chunks_path)
+        
+        # Indices built before quantization (or without SimSIMD) saved a
+        # float32 matrix
+        matrix = np.load(matrix_path) if os.path.exists(matrix_path) else None
+        scales = np.load(scales_path) if matrix is not None and matrix.dtype == np.int8 else None
+        if scales is not None and simsimd is None:
+            # Dequantize once here rather than in every NumPy search
+            matrix = matrix.astype(np.float32)
+            matrix *= scales[:, np.newaxis]
+            scales = None
+        
+        self._index_cache[channel_name] = (index, chunks, matrix, scales, mtime)
+        logger.info(f"Loaded index for channel {channel_name} with {len(chunks)} chunks")
+        
+        return index, chunks, matrix, scales
+    
+    def search(self, channel_name: str, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search the index for similar chunks.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            query_embedding: Query embedding
+            top_k: Number of results to return
+            
+        Returns:
+            List of search results
+        """
+        loaded = self._load_index(channel_name)
+        if loaded is None:
+            return []
+        index, chunks, matrix, scales = loaded
         
         # Convert query embedding to numpy array
         query_embedding_np = np.array([query_embedding], dtype=np.float32)
+        inner_product = index is None or index.metric_type == faiss.METRIC_INNER_PRODUCT
+        if inner_product:
+            _normalize_rows(query_embedding_np)
         
-        # Search index
-        distances, indices = index.search(query_embedding_np, top_k)
+        if matrix is not None:
+            # Exact search: one similarity scan and a partial sort
+            scores = _similarities(matrix, query_embedding_np[0], scales)
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            order = top[np.argsort(-scores[top])]
+            distances, indices = scores[order][np.newaxis], order[np.newaxis]
+        else:
+            # Widen the search beam for larger result sets
+            if isinstance(index, faiss.IndexHNSW):
+                index.hnsw.efSearch = max(self.HNSW_EF_SEARCH, top_k * 4)
+            elif isinstance(index, faiss.IndexIVF):
+                index.nprobe = max(index.nprobe, 16)
+            
+            # Search index
+            distances, indices = index.search(query_embedding_np, top_k)
         
         # Get results
         results = []
@@ -174,8 +423,13 @@ class VectorDatabase:
                 continue
             
             chunk = chunks[idx]
-            result = chunk.copy()
-            result['score'] = float(1.0 / (1.0 + distances[0][i]))  # Convert distance to score
+            result = {key: chunk[key] for key in _RESULT_KEYS if key in chunk}
+            if inner_product:
+                # Inner product of normalized vectors is cosine similarity
+                result['score'] = float(distances[0][i])
+            else:
+                # Indices built before the switch to inner product use L2 distance
+                result['score'] = float(1.0 / (1.0 + distances[0][i]))
             results.append(result)
         
         return results
@@ -6,17 +6,27 @@ and prepares it for semantic chunking and embedding.
 """
 
 import os
-import json
+import hashlib
 import logging
+import numpy as np
+from concurrent.futures import Executor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.utils.json_utils import compressed_path, find_jsonl, iter_jsonl, read_json, write_json, write_jsonl
+from src.utils.pipeline import imap_unordered, needs_rebuild, process_pool
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Zero-padded seconds of a minute, for formatting timestamps
+_SECONDS = [f'{s:02d}' for s in range(60)]
+
+# Version of extract_text_entities, part of the entity cache key; bump it
+# whenever the extraction changes so stale cached entities are not reused
+ENTITY_EXTRACTOR_VERSION = 1
 
 class VideoProcessor:
     """
@@ -34,8 +44,11 @@ class VideoProcessor:
         self.raw_data_dir = raw_data_dir
         self.processed_data_dir = processed_data_dir
         
-        # Create processed data directory if it doesn't exist
-        os.makedirs(self.processed_data_dir, exist_ok=True)
+        # Extracted entities, keyed by a hash of the text they were extracted from
+        self.entity_cache_dir = os.path.join(processed_data_dir, '.entity_cache')
+        
+        # Create processed and entity cache directories if they don't exist
+        os.makedirs(self.entity_cache_dir, exist_ok=True)
         
         logger.info(f"Initialized video processor")
     
@@ -50,6 +63,55 @@ class VideoProcessor:
         Returns:
             Dictionary containing processed video data
         """
+        processed_video_path = self._processed_video_path(channel_name, video_id)
+        if not self._needs_processing(channel_name, video_id):
+            logger.info(f"Video {video_id} skipped (up-to-date)")
+            return read_json(processed_video_path)
+        
+        raw_video_data = self.load_raw_video(channel_name, video_id)
+        if not raw_video_data:
+            return {}
+        
+        return self.process_video_data(channel_name, raw_video_data)
+    
+    def _processed_video_path(self, channel_name: str, video_id: str) -> str:
+        """Get the path of the processed data of a video."""
+        return os.path.join(self.processed_data_dir, channel_name, f'{video_id}.json')
+    
+    def _needs_processing(self, channel_name: str, video_id: str) -> bool:
+        """Check whether the processed data of a video is missing or older than its raw data."""
+        raw_video_dir = os.path.join(self.raw_data_dir, channel_name, 'videos', video_id)
+        return needs_rebuild(
+            self._processed_video_path(channel_name, video_id),
+            os.path.join(raw_video_dir, 'video_data.json'),
+            find_jsonl(os.path.join(raw_video_dir, 'transcript.jsonl'))
+        )
+    
+    def _process_video(self, channel_name: str, video: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Process a single video, given its ID or its raw data."""
+        if isinstance(video, str):
+            return self.process_video(channel_name, video)
+        
+        # Freshly crawled data carries its transcript and may not be on disk
+        # yet, so only data loaded back from disk can be up to date
+        video_id = video['video_id']
+        if 'transcript' not in video and not self._needs_processing(channel_name, video_id):
+            logger.info(f"Video {video_id} skipped (up-to-date)")
+            return read_json(self._processed_video_path(channel_name, video_id))
+        
+        return self.process_video_data(channel_name, video)
+    
+    def load_raw_video(self, channel_name: str, video_id: str) -> Dict[str, Any]:
+        """
+        Load raw crawled data for a single video.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            video_id: YouTube video ID
+            
+        Returns:
+            Dictionary containing raw video data, or empty dict if not found
+        """
         # Define paths
         raw_video_dir = os.path.join(self.raw_data_dir, channel_name, 'videos', video_id)
         raw_video_path = os.path.join(raw_video_dir, 'video_data.json')
@@ -60,15 +122,39 @@ class VideoProcessor:
             return {}
         
         # Load raw video data
-        with open(raw_video_path, 'r', encoding='utf-8') as f:
-            raw_video_data = json.load(f)
+        raw_video_data = read_json(raw_video_path)
+        
+        return raw_video_data
+    
+    def process_video_data(self, channel_name: str, raw_video_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process raw data for a single video.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            raw_video_data: Raw video data as produced by the crawler
+            
+        Returns:
+            Dictionary containing processed video data
+        """
+        video_id = raw_video_data['video_id']
+        
+        # Stream the transcript from disk if it isn't already in memory; the
+        # crawler stores it next to the video data, one segment per line
+        # (older crawls embed it in video_data.json)
+        transcript = raw_video_data.get('transcript')
+        if transcript is None:
+            raw_transcript_path = find_jsonl(
+                os.path.join(self.raw_data_dir, channel_name, 'videos', video_id, 'transcript.jsonl')
+            )
+            transcript = iter_jsonl(raw_transcript_path) if raw_transcript_path else []
         
         # Process transcript
-        transcript = raw_video_data.get('transcript', [])
         processed_transcript = self.process_transcript(transcript)
         
-        # Extract entities (tools, brands, etc.)
-        entities = self.extract_entities(raw_video_data)
+        # Extract entities (tools, brands, etc.); the raw segments were
+        # consumed, so the processed ones stand in for them
+        entities = self.extract_entities({**raw_video_data, 'transcript': processed_transcript})
         
         # Create processed video data
         processed_video_data = {
@@ -90,49 +176,55 @@ class VideoProcessor:
         os.makedirs(channel_processed_dir, exist_ok=True)
         
         # Save processed video data
-        processed_video_path = os.path.join(channel_processed_dir, f'{video_id}.json')
-        with open(processed_video_path, 'w', encoding='utf-8') as f:
-            json.dump(processed_video_data, f, ensure_ascii=False, indent=2)
+        processed_video_path = self._processed_video_path(channel_name, video_id)
+        write_json(processed_video_path, processed_video_data, indent=False)
         
         logger.info(f"Processed video {video_id} saved to {processed_video_path}")
         return processed_video_data
     
-    def process_transcript(self, transcript: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def process_transcript(self, transcript: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Process transcript segments.
         
         Args:
-            transcript: List of transcript segments from YouTube
+            transcript: Transcript segments from YouTube, in order
             
         Returns:
             List of processed transcript segments
         """
-        processed_segments = []
-        
+        # Extract segment data, skipping empty segments
+        segments = []
         for i, segment in enumerate(transcript):
-            # Extract segment data
             text = segment.get('text', '').strip()
-            start = segment.get('start', 0)
-            duration = segment.get('duration', 0)
-            
-            # Skip empty segments
-            if not text:
-                continue
-            
-            # Create processed segment
-            processed_segment = {
+            if text:
+                segments.append((i, text, segment.get('start', 0), segment.get('duration', 0)))
+        
+        if not segments:
+            return []
+        
+        # Compute the times of all segments at once
+        starts = np.fromiter((start for _, _, start, _ in segments), dtype=np.float64, count=len(segments))
+        durations = np.fromiter((duration for _, _, _, duration in segments), dtype=np.float64, count=len(segments))
+        end_times = (starts + durations).tolist()
+        timestamp_seconds = starts.astype(np.int64).tolist()
+        minutes, seconds = np.divmod(starts, 60)
+        minutes = minutes.astype(np.int64).tolist()
+        seconds = seconds.astype(np.int64).tolist()
+        
+        # Create processed segments
+        return [
+            {
                 'index': i,
                 'text': text,
                 'start_time': start,
-                'end_time': start + duration,
+                'end_time': end_time,
                 'duration': duration,
-                'timestamp_seconds': int(start),
-                'timestamp_formatted': self.format_timestamp(start)
+                'timestamp_seconds': whole_seconds,
+                'timestamp_formatted': f"{segment_minutes}:{_SECONDS[segment_seconds]}"
             }
-            
-            processed_segments.append(processed_segment)
-        
-        return processed_segments
+            for (i, text, start, duration), end_time, whole_seconds, segment_minutes, segment_seconds
+            in zip(segments, end_times, timestamp_seconds, minutes, seconds)
+        ]
     
     def format_timestamp(self, seconds: float) -> str:
         """
@@ -158,7 +250,7 @@ class VideoProcessor:
         Returns:
             Full transcript text
         """
-        return ' '.join(segment['text'] for segment in processed_transcript)
+        return ' '.join([segment['text'] for segment in processed_transcript])
     
     def extract_entities(self, video_data: Dict[str, Any]) -> Dict[str, List[str]]:
         """
@@ -167,6 +259,45 @@ class VideoProcessor:
         Args:
             video_data: Raw video data
             
+        Returns:
+            Dictionary of entity types and their values
+        """
+        # Extract from title, description and transcript; the texts are
+        # used one by one rather than joined into one large string
+        transcript = video_data.get('transcript', [])
+        texts = [video_data.get('title', ''), video_data.get('description', '')]
+        texts.extend([segment.get('text', '') for segment in transcript])
+        
+        # Reuse the entities extracted from the same texts by an earlier run
+        # of the same extractor version; the key hashes the version and the
+        # texts joined by spaces
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f'v{ENTITY_EXTRACTOR_VERSION}\n'.encode('utf-8'))
+        for i, text in enumerate(texts):
+            if i:
+                hasher.update(b' ')
+            hasher.update(text.encode('utf-8'))
+        cache_path = os.path.join(self.entity_cache_dir, f'{hasher.hexdigest()}.json')
+        if os.path.exists(cache_path):
+            return read_json(cache_path)
+        
+        entities = self.extract_text_entities(texts)
+        
+        # Written under a temporary name first, since worker processes may
+        # cache the same texts concurrently
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        write_json(tmp_path, entities, indent=False)
+        os.replace(tmp_path, cache_path)
+        
+        return entities
+    
+    def extract_text_entities(self, texts: List[str]) -> Dict[str, List[str]]:
+        """
+        Extract entities (tools, brands, etc.) from texts.
+        
+        Args:
+            texts: Title, description and transcript segment texts of a video
+            
         Returns:
             Dictionary of entity types and their values
         """
@@ -177,18 +308,8 @@ class VideoProcessor:
             'topics': []
         }
         
-        # Extract from title and description
-        title = video_data.get('title', '')
-        description = video_data.get('description', '')
-        
-        # Extract from transcript
-        transcript = video_data.get('transcript', [])
-        transcript_text = ' '.join(segment.get('text', '') for segment in transcript)
-        
-        # Combine all text for entity extraction
-        all_text = f"{title} {description} {transcript_text}"
-        
-        # TODO: Implement more sophisticated entity extraction
+        # TODO: Implement more sophisticated entity extraction, matching
+        # module-level precompiled patterns against each text
         # For now, just return empty entities
         
         return entities
@@ -215,37 +336,59 @@ class VideoProcessor:
         # Get list of video IDs
         video_ids = []
         if os.path.exists(raw_videos_dir):
-            video_ids = [d for d in os.listdir(raw_videos_dir) if os.path.isdir(os.path.join(raw_videos_dir, d))]
+            video_ids = [entry.name for entry in os.scandir(raw_videos_dir) if entry.is_dir()]
         
         logger.info(f"Found {len(video_ids)} videos for channel {channel_name}")
         
-        # Process each video
-        processed_videos = []
-        for i, video_id in enumerate(video_ids):
-            logger.info(f"Processing video {i+1}/{len(video_ids)}: {video_id}")
-            processed_video = self.process_video(channel_name, video_id)
+        # Process videos on all cores; each video is independent, and is
+        # loaded by the worker that processes it
+        if len(video_ids) < 2:
+            return list(self.iter_process_videos(channel_name, video_ids))
+        with process_pool() as pool:
+            return list(self.iter_process_videos(channel_name, video_ids, executor=pool))
+    
+    def iter_process_videos(self, channel_name: str, raw_videos: Iterable[Union[str, Dict[str, Any]]],
+                            executor: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process videos as they arrive, yielding each processed video.
+        
+        Videos whose processed data is newer than their raw data are not
+        processed again; their processed data is loaded instead. The summary
+        of processed videos is saved once the input is exhausted.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            raw_videos: YouTube video IDs, or raw video data dictionaries
+            executor: Optional executor (e.g. a process pool) to process
+                videos on; results are then yielded in completion order
+            
+        Yields:
+            Processed video data dictionaries
+        """
+        process = partial(self._process_video, channel_name)
+        if executor is None:
+            processed_videos = map(process, raw_videos)
+        else:
+            processed_videos = imap_unordered(executor, process, raw_videos)
+        
+        summary_data = []
+        for processed_video in processed_videos:
             if processed_video:
-                processed_videos.append(processed_video)
+                summary_data.append({
+                    'video_id': processed_video['video_id'],
+                    'title': processed_video['title'],
+                    'url': processed_video['url'],
+                    'transcript_segments': len(processed_video.get('transcript', [])),
+                    'processing_date': processed_video['processing_date']
+                })
+                yield processed_video
         
         # Create processed data directory for channel if it doesn't exist
         channel_processed_dir = os.path.join(self.processed_data_dir, channel_name)
         os.makedirs(channel_processed_dir, exist_ok=True)
         
-        # Save summary of processed videos
-        summary_path = os.path.join(channel_processed_dir, 'processed_videos_summary.json')
-        summary_data = [
-            {
-                'video_id': video['video_id'],
-                'title': video['title'],
-                'url': video['url'],
-                'transcript_segments': len(video.get('transcript', [])),
-                'processing_date': video['processing_date']
-            }
-            for video in processed_videos
-        ]
-        
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary_data, f, ensure_ascii=False, indent=2)
+        # Save summary of processed videos, one video per line
+        summary_path = compressed_path(os.path.join(channel_processed_dir, 'processed_videos_summary.jsonl'))
+        write_jsonl(summary_path, summary_data)
         
-        logger.info(f"Processed {len(processed_videos)} videos, summary saved to {summary_path}")
-        return processed_videos
+        logger.info(f"Processed {len(summary_data)} videos, summary saved to {summary_path}")
@@ -6,17 +6,19 @@ It ensures that content is properly segmented for effective semantic search.
 """
 
 import os
-import json
+import shutil
 import logging
+from concurrent.futures import Executor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.utils.json_utils import compressed_path, iter_jsonl, read_json, write_jsonl
+from src.utils.pipeline import imap_unordered, needs_rebuild, process_pool
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class ContentChunker:
     """
@@ -51,16 +53,48 @@ class ContentChunker:
             List of content chunks
         """
         # Define paths
-        processed_video_path = os.path.join(self.processed_data_dir, channel_name, f'{video_id}.json')
+        processed_video_path = self._processed_video_path(channel_name, video_id)
         
         # Check if processed video data exists
         if not os.path.exists(processed_video_path):
             logger.warning(f"Processed video data not found for {video_id}")
             return []
         
+        # Reuse chunks made from the same processed data
+        if not self._needs_chunking(channel_name, video_id):
+            logger.info(f"Video {video_id} skipped (up-to-date)")
+            return list(iter_jsonl(self._chunked_data_path(channel_name, video_id)))
+        
         # Load processed video data
-        with open(processed_video_path, 'r', encoding='utf-8') as f:
-            processed_video_data = json.load(f)
+        return self.chunk_video_data(channel_name, read_json(processed_video_path))
+    
+    def _processed_video_path(self, channel_name: str, video_id: str) -> str:
+        """Get the path of the processed data of a video."""
+        return os.path.join(self.processed_data_dir, channel_name, f'{video_id}.json')
+    
+    def _chunked_data_path(self, channel_name: str, video_id: str) -> str:
+        """Get the path of the chunked data of a video."""
+        return os.path.join(self.chunked_data_dir, channel_name, f'{video_id}_chunks.jsonl')
+    
+    def _needs_chunking(self, channel_name: str, video_id: str) -> bool:
+        """Check whether the chunked data of a video is missing or older than its processed data."""
+        return needs_rebuild(
+            self._chunked_data_path(channel_name, video_id),
+            self._processed_video_path(channel_name, video_id)
+        )
+    
+    def chunk_video_data(self, channel_name: str, processed_video_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Chunk content for a single video from its processed data.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            processed_video_data: Processed video data as produced by the processor
+            
+        Returns:
+            List of content chunks
+        """
+        video_id = processed_video_data['video_id']
         
         # Extract video metadata
         video_title = processed_video_data.get('title', '')
@@ -68,6 +102,9 @@ class ContentChunker:
         video_url = processed_video_data.get('url', '')
         timestamp_base_url = processed_video_data.get('timestamp_base_url', '')
         
+        # All chunks of a run share one chunking date
+        chunking_date = datetime.now().isoformat()
+        
         # Chunk video metadata
         metadata_chunks = self.chunk_metadata(
             video_id=video_id,
@@ -75,7 +112,8 @@ class ContentChunker:
             title=video_title,
             description=video_description,
             url=video_url,
-            timestamp_base_url=timestamp_base_url
+            timestamp_base_url=timestamp_base_url,
+            chunking_date=chunking_date
         )
         
         # Chunk transcript
@@ -86,7 +124,8 @@ class ContentChunker:
             title=video_title,
             transcript=transcript,
             url=video_url,
-            timestamp_base_url=timestamp_base_url
+            timestamp_base_url=timestamp_base_url,
+            chunking_date=chunking_date
         )
         
         # Combine all chunks
@@ -96,16 +135,15 @@ class ContentChunker:
         channel_chunked_dir = os.path.join(self.chunked_data_dir, channel_name)
         os.makedirs(channel_chunked_dir, exist_ok=True)
         
-        # Save chunked data
-        chunked_data_path = os.path.join(channel_chunked_dir, f'{video_id}_chunks.json')
-        with open(chunked_data_path, 'w', encoding='utf-8') as f:
-            json.dump(all_chunks, f, ensure_ascii=False, indent=2)
+        # Save chunked data, one chunk per line
+        chunked_data_path = self._chunked_data_path(channel_name, video_id)
+        write_jsonl(chunked_data_path, all_chunks)
         
         logger.info(f"Created {len(all_chunks)} chunks for video {video_id}, saved to {chunked_data_path}")
         return all_chunks
     
     def chunk_metadata(self, video_id: str, channel_name: str, title: str, description: str, 
-                      url: str, timestamp_base_url: str) -> List[Dict[str, Any]]:
+                      url: str, timestamp_base_url: str, chunking_date: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Chunk video metadata.
         
@@ -116,26 +154,33 @@ class ContentChunker:
             description: Video description
             url: Video URL
             timestamp_base_url: Base URL for timestamps
+            chunking_date: ISO format chunking time (default: now)
             
         Returns:
             List of metadata chunks
         """
         chunks = []
+        chunking_date = chunking_date or datetime.now().isoformat()
+        
+        # Fields shared by all metadata chunks, built once
+        shared_fields = {
+            'video_id': video_id,
+            'channel_name': channel_name,
+            'video_title': title,
+            'video_url': url,
+            'timestamp_url': url,
+            'start_time': 0,
+            'end_time': 0,
+            'chunking_date': chunking_date
+        }
         
         # Create title chunk
         if title:
             title_chunk = {
                 'chunk_id': f"{video_id}_title",
-                'video_id': video_id,
-                'channel_name': channel_name,
                 'chunk_type': 'title',
                 'text': title,
-                'video_title': title,
-                'video_url': url,
-                'timestamp_url': url,
-                'start_time': 0,
-                'end_time': 0,
-                'chunking_date': datetime.now().isoformat()
+                **shared_fields
             }
             chunks.append(title_chunk)
         
@@ -151,23 +196,16 @@ class ContentChunker:
                 
                 description_chunk = {
                     'chunk_id': f"{video_id}_description_{i}",
-                    'video_id': video_id,
-                    'channel_name': channel_name,
                     'chunk_type': 'description',
                     'text': paragraph,
-                    'video_title': title,
-                    'video_url': url,
-                    'timestamp_url': url,
-                    'start_time': 0,
-                    'end_time': 0,
-                    'chunking_date': datetime.now().isoformat()
+                    **shared_fields
                 }
                 chunks.append(description_chunk)
         
         return chunks
     
     def chunk_transcript(self, video_id: str, channel_name: str, title: str, transcript: List[Dict[str, Any]],
-                        url: str, timestamp_base_url: str) -> List[Dict[str, Any]]:
+                        url: str, timestamp_base_url: str, chunking_date: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Chunk video transcript.
         
@@ -178,11 +216,13 @@ class ContentChunker:
             transcript: List of transcript segments
             url: Video URL
             timestamp_base_url: Base URL for timestamps
+            chunking_date: ISO format chunking time (default: now)
             
         Returns:
             List of transcript chunks
         """
         chunks = []
+        chunking_date = chunking_date or datetime.now().isoformat()
         
         # If transcript is empty, return empty list
         if not transcript:
@@ -192,22 +232,22 @@ class ContentChunker:
         max_chunk_size = 5  # Maximum number of segments per chunk
         overlap = 1  # Number of overlapping segments between chunks
         
-        # Create chunks with sliding window
-        for i in range(0, len(transcript), max_chunk_size - overlap):
-            # Get segment range for this chunk
-            start_idx = i
-            end_idx = min(i + max_chunk_size, len(transcript))
-            
-            # Skip if we've reached the end
-            if start_idx >= len(transcript):
-                break
-            
+        # Fields shared by all transcript chunks, built once
+        shared_fields = {
+            'video_id': video_id,
+            'channel_name': channel_name,
+            'chunk_type': 'transcript',
+            'video_title': title,
+            'video_url': url,
+            'chunking_date': chunking_date
+        }
+        
+        # Create chunks with sliding window; every window starts inside the
+        # transcript, so none is empty
+        for start_idx in range(0, len(transcript), max_chunk_size - overlap):
             # Get segments for this chunk
-            segments = transcript[start_idx:end_idx]
-            
-            # Skip if no segments
-            if not segments:
-                continue
+            segments = transcript[start_idx:start_idx + max_chunk_size]
+            end_idx = start_idx + len(segments)
             
             # Extract segment data
             start_time = segments[0]['start_time']
@@ -216,7 +256,7 @@ class ContentChunker:
             timestamp_formatted = segments[0]['timestamp_formatted']
             
             # Combine segment text
-            text = ' '.join(segment['text'] for segment in segments)
+            text = ' '.join([segment['text'] for segment in segments])
             
             # Create timestamp URL
             timestamp_url = f"{timestamp_base_url}{timestamp_seconds}"
@@ -224,25 +264,47 @@ class ContentChunker:
             # Create chunk
             chunk = {
                 'chunk_id': f"{video_id}_transcript_{start_idx}_{end_idx}",
-                'video_id': video_id,
-                'channel_name': channel_name,
-                'chunk_type': 'transcript',
                 'text': text,
-                'video_title': title,
-                'video_url': url,
                 'timestamp_url': timestamp_url,
                 'start_time': start_time,
                 'end_time': end_time,
                 'timestamp_seconds': timestamp_seconds,
                 'timestamp_formatted': timestamp_formatted,
                 'segment_indices': list(range(start_idx, end_idx)),
-                'chunking_date': datetime.now().isoformat()
+                **shared_fields
             }
             
             chunks.append(chunk)
         
         return chunks
     
+    def _chunk_video(self, channel_name: str, video: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Chunk a single video, given its ID or its processed data, and return
+        its chunk count. Given processed data, the chunk texts are returned
+        too, so the embedder doesn't have to read them back.
+        """
+        if isinstance(video, str):
+            logger.info(f"Chunking video {video}")
+            chunks = self.chunk_video_content(channel_name, video)
+            return {
+                'video_id': video,
+                'chunks_count': len(chunks)
+            }
+        
+        video_id = video['video_id']
+        if self._needs_chunking(channel_name, video_id):
+            logger.info(f"Chunking video {video_id}")
+            chunks = self.chunk_video_data(channel_name, video)
+        else:
+            logger.info(f"Video {video_id} skipped (up-to-date)")
+            chunks = list(iter_jsonl(self._chunked_data_path(channel_name, video_id)))
+        return {
+            'video_id': video['video_id'],
+            'chunks_count': len(chunks),
+            'texts': [chunk['text'] for chunk in chunks]
+        }
+    
     def process_channel_videos(self, channel_name: str) -> List[Dict[str, Any]]:
         """
         Process all videos for a channel.
@@ -262,33 +324,77 @@ class ContentChunker:
             return []
         
         # Get list of video IDs
-        video_ids = []
-        for filename in os.listdir(processed_channel_dir):
-            if filename.endswith('.json') and filename != 'processed_videos_summary.json':
-                video_id = filename.replace('.json', '')
-                video_ids.append(video_id)
+        video_ids = [
+            entry.name[:-len('.json')] for entry in os.scandir(processed_channel_dir)
+            if entry.name.endswith('.json') and entry.name != 'processed_videos_summary.json' and entry.is_file()
+        ]
         
         logger.info(f"Found {len(video_ids)} processed videos for channel {channel_name}")
         
-        # Process each video
+        # Chunk videos on all cores; each video is independent
+        if len(video_ids) < 2:
+            results = list(self.iter_chunk_videos(channel_name, video_ids))
+        else:
+            with process_pool() as pool:
+                results = list(self.iter_chunk_videos(channel_name, video_ids, executor=pool))
+        
+        self._write_chunks_archive(channel_name, [result['video_id'] for result in results])
+        return results
+    
+    def _write_chunks_archive(self, channel_name: str, video_ids: List[str]) -> None:
+        """
+        Concatenate the chunk files of a channel into chunks_archive.jsonl,
+        so the embedder can read all chunks in one sequential pass.
+        """
+        archive_path = os.path.join(self.chunked_data_dir, channel_name, 'chunks_archive.jsonl')
+        tmp_path = archive_path + '.tmp'
+        with open(tmp_path, 'wb') as archive:
+            for video_id in video_ids:
+                with open(self._chunked_data_path(channel_name, video_id), 'rb') as f:
+                    shutil.copyfileobj(f, archive)
+        os.replace(tmp_path, archive_path)
+        
+        logger.info(f"Archived chunks of {len(video_ids)} videos to {archive_path}")
+    
+    def iter_chunk_videos(self, channel_name: str, videos: Iterable[Union[str, Dict[str, Any]]],
+                          executor: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk videos as they arrive, yielding a result for each chunked video.
+        
+        Videos whose chunked data is newer than their processed data are not
+        chunked again. The summary of chunked videos is saved once the input
+        is exhausted.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            videos: YouTube video IDs of processed videos, or processed video
+                data dictionaries, which are chunked without reading them
+                back from disk
+            executor: Optional executor (e.g. a process pool) to chunk
+                videos on; results are then yielded in completion order
+            
+        Yields:
+            Dictionaries with the video ID and number of chunks, plus the
+            chunk texts for videos given as processed data
+        """
+        chunk = partial(self._chunk_video, channel_name)
+        if executor is None:
+            results = map(chunk, videos)
+        else:
+            results = imap_unordered(executor, chunk, videos)
+        
         processed_videos = []
-        for i, video_id in enumerate(video_ids):
-            logger.info(f"Chunking video {i+1}/{len(video_ids)}: {video_id}")
-            chunks = self.chunk_video_content(channel_name, video_id)
-            if chunks:
-                processed_videos.append({
-                    'video_id': video_id,
-                    'chunks_count': len(chunks)
-                })
+        for result in results:
+            if result['chunks_count']:
+                processed_videos.append({'video_id': result['video_id'], 'chunks_count': result['chunks_count']})
+                yield result
         
         # Create chunked data directory for channel if it doesn't exist
         channel_chunked_dir = os.path.join(self.chunked_data_dir, channel_name)
         os.makedirs(channel_chunked_dir, exist_ok=True)
         
-        # Save summary of chunked videos
-        summary_path = os.path.join(channel_chunked_dir, 'chunked_videos_summary.json')
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(processed_videos, f, ensure_ascii=False, indent=2)
+        # Save summary of chunked videos, one video per line
+        summary_path = compressed_path(os.path.join(channel_chunked_dir, 'chunked_videos_summary.jsonl'))
+        write_jsonl(summary_path, processed_videos)
         
         logger.info(f"Chunked {len(processed_videos)} videos, summary saved to {summary_path}")
-        return processed_videos
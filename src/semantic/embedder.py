@@ -5,27 +5,46 @@ This module generates embeddings for chunked content using sentence-transformers
 These embeddings are used for semantic search and retrieval.
 """
 
+import io
 import os
-import json
+import uuid
 import logging
 import numpy as np
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-from sentence_transformers import SentenceTransformer
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.semantic.models import get_model
+from src.utils.json_utils import compressed_path, dumps_jsonl, find_jsonl, iter_jsonl, read_json, write_json, write_jsonl
+from src.utils.pipeline import imap_unordered, needs_rebuild
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class ContentEmbedder:
     """
     Embedder for chunked content.
     """
     
-    def __init__(self, chunked_data_dir: str, embeddings_dir: str, model_name: str = 'all-MiniLM-L6-v2'):
+    # Default number of texts per model forward pass
+    ENCODE_BATCH_SIZE = 128
+    
+    # Number of threads reading chunk files ahead of the model (and
+    # writing embeddings behind it)
+    READ_WORKERS = 8
+    
+    # Maximum number of videos read ahead of the model
+    READ_AHEAD = 16
+    
+    # Storage type of saved embeddings; normalized embeddings lose no
+    # meaningful precision in half precision, at half the size of float32
+    EMBEDDING_DTYPE = np.float16
+    
+    def __init__(self, chunked_data_dir: str, embeddings_dir: str, model_name: str = 'all-MiniLM-L6-v2',
+                 batch_size: Optional[int] = None):
         """
         Initialize the content embedder.
         
@@ -33,77 +52,132 @@ class ContentEmbedder:
             chunked_data_dir: Directory containing chunked content
             embeddings_dir: Directory to save embeddings
             model_name: Name of the sentence-transformers model to use
+            batch_size: Number of texts per model forward pass (defaults
+                to ENCODE_BATCH_SIZE)
         """
         self.chunked_data_dir = chunked_data_dir
         self.embeddings_dir = embeddings_dir
         self.model_name = model_name
+        self.batch_size = batch_size or self.ENCODE_BATCH_SIZE
         
         # Create embeddings directory if it doesn't exist
         os.makedirs(self.embeddings_dir, exist_ok=True)
         
-        # Load embedding model
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        # Load embedding model, shared with the query processor when both
+        # run in one process (e.g. an auto refresh from the CLI)
+        self.model = get_model(model_name)
         
         logger.info(f"Initialized content embedder with model {model_name}")
     
-    def embed_video_chunks(self, channel_name: str, video_id: str) -> Dict[str, Any]:
+    def _chunked_data_path(self, channel_name: str, video_id: str) -> Optional[str]:
+        """Find the chunked data file of a video, or return None if it doesn't exist."""
+        base_path = os.path.join(self.chunked_data_dir, channel_name, f'{video_id}_chunks')
+        
+        # Older chunkers wrote a single JSON array
+        for path in (base_path + '.jsonl', base_path + '.json'):
+            if os.path.exists(path):
+                return path
+        
+        return None
+    
+    def _embeddings_path(self, channel_name: str, video_id: str) -> str:
+        """Get the path of the embeddings of a video."""
+        return os.path.join(self.embeddings_dir, channel_name, f'{video_id}_embeddings.npy')
+    
+    def _iter_chunks(self, channel_name: str, video_id: str) -> Optional[Iterator[Dict[str, Any]]]:
+        """Iterate over the chunks of a video, or return None if its chunked data doesn't exist."""
+        chunked_data_path = self._chunked_data_path(channel_name, video_id)
+        if chunked_data_path is None:
+            return None
+        if chunked_data_path.endswith('.jsonl'):
+            return iter_jsonl(chunked_data_path)
+        return iter(read_json(chunked_data_path))
+    
+    def _load_texts(self, channel_name: str, video_id: str) -> Optional[List[str]]:
+        """Load the chunk texts of a video, or None if its chunked data doesn't exist."""
+        chunks = self._iter_chunks(channel_name, video_id)
+        if chunks is None:
+            logger.warning(f"Chunked data not found for video {video_id}")
+            return None
+        
+        # Only the texts are kept; the rest of the chunk metadata is read
+        # again when embeddings are consolidated
+        return [chunk['text'] for chunk in chunks]
+    
+    def _embed_batch(self, channel_name: str, batch: List[Tuple[str, List[str]]],
+                     save: Callable[[str, np.ndarray], Any] = np.save) -> List[Dict[str, Any]]:
         """
-        Generate embeddings for chunks of a single video.
+        Embed the chunks of several videos with a single encode call.
         
         Args:
             channel_name: Name of the channel (without @ symbol)
-            video_id: YouTube video ID
+            batch: (video_id, chunk texts) pairs
+            save: Function saving an embeddings matrix to a path
             
         Returns:
-            Dictionary containing embedding data
+            Embedding result for each video, in batch order
         """
-        # Define paths
-        chunked_data_path = os.path.join(self.chunked_data_dir, channel_name, f'{video_id}_chunks.json')
-        
-        # Check if chunked data exists
-        if not os.path.exists(chunked_data_path):
-            logger.warning(f"Chunked data not found for video {video_id}")
-            return {}
+        all_texts = [text for _, texts in batch for text in texts]
+        logger.info(f"Generating embeddings for {len(all_texts)} chunks of {len(batch)} videos")
         
-        # Load chunked data
-        with open(chunked_data_path, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
-        
-        logger.info(f"Generating embeddings for {len(chunks)} chunks of video {video_id}")
-        
-        # Extract texts for embedding
-        texts = [chunk['text'] for chunk in chunks]
-        
-        # Generate embeddings
-        embeddings = self.model.encode(texts)
-        
-        # Add embeddings to chunks
-        for i, chunk in enumerate(chunks):
-            chunk['embedding'] = embeddings[i].tolist()
+        # Large batches keep the model busy instead of paying the per-call
+        # overhead for every short video
+        embeddings = self.model.encode(
+            all_texts,
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
         
         # Create embeddings directory for channel if it doesn't exist
         channel_embeddings_dir = os.path.join(self.embeddings_dir, channel_name)
         os.makedirs(channel_embeddings_dir, exist_ok=True)
         
-        # Save embeddings
-        embeddings_path = os.path.join(channel_embeddings_dir, f'{video_id}_embeddings.json')
-        with open(embeddings_path, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, ensure_ascii=False, indent=2)
+        # Scatter the rows back to per-video files; row i of a video's
+        # embeddings belongs to chunk i of its chunked data
+        results = []
+        row = 0
+        embedding_date = datetime.now().isoformat()
+        for video_id, texts in batch:
+            embeddings_path = self._embeddings_path(channel_name, video_id)
+            save(embeddings_path, embeddings[row:row + len(texts)].astype(self.EMBEDDING_DTYPE))
+            row += len(texts)
+            
+            results.append({
+                'video_id': video_id,
+                'chunks_count': len(texts),
+                'embedding_model': self.model_name,
+                'embedding_date': embedding_date
+            })
+        
+        return results
+    
+    def embed_video_chunks(self, channel_name: str, video_id: str) -> Dict[str, Any]:
+        """
+        Generate embeddings for chunks of a single video.
         
-        logger.info(f"Generated embeddings for video {video_id}, saved to {embeddings_path}")
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            video_id: YouTube video ID
+            
+        Returns:
+            Dictionary containing embedding data
+        """
+        texts = self._load_texts(channel_name, video_id)
+        if not texts:
+            return {}
         
-        return {
-            'video_id': video_id,
-            'chunks_count': len(chunks),
-            'embedding_model': self.model_name,
-            'embedding_date': datetime.now().isoformat()
-        }
+        result = self._embed_batch(channel_name, [(video_id, texts)])[0]
+        logger.info(f"Generated embeddings for video {video_id}")
+        return result
     
     def process_channel_videos(self, channel_name: str) -> List[Dict[str, Any]]:
         """
         Generate embeddings for all videos of a channel.
         
+        The chunks of all videos are embedded in a single batch.
+        
         Args:
             channel_name: Name of the channel (without @ symbol)
             
@@ -119,30 +193,320 @@ class ContentEmbedder:
             return []
         
         # Get list of video IDs
-        video_ids = []
-        for filename in os.listdir(chunked_channel_dir):
-            if filename.endswith('_chunks.json'):
-                video_id = filename.replace('_chunks.json', '')
-                video_ids.append(video_id)
+        video_ids = set()
+        for entry in os.scandir(chunked_channel_dir):
+            for suffix in ('_chunks.jsonl', '_chunks.json'):
+                if entry.name.endswith(suffix) and entry.is_file():
+                    video_ids.add(entry.name[:-len(suffix)])
+        video_ids = sorted(video_ids)
         
         logger.info(f"Found {len(video_ids)} chunked videos for channel {channel_name}")
         
-        # Process each video
+        # Process all videos at once
+        videos = self._load_chunks_archive(channel_name, video_ids)
+        return list(self.iter_embed_videos(channel_name, videos, batch_chunks=None))
+    
+    def _load_chunks_archive(self, channel_name: str, video_ids: List[str]) -> List[Union[str, Dict[str, Any]]]:
+        """
+        Get the chunk texts of videos from the chunk archive written by the
+        chunker, which is read in one pass instead of one file per video.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            video_ids: YouTube video IDs of chunked videos
+            
+        Returns:
+            Dictionaries with the video ID and chunk texts of the archived
+            videos, and the IDs of the others, to be read from their own files;
+            only IDs if the archive is missing or older than any chunk file
+        """
+        archive_path = os.path.join(self.chunked_data_dir, channel_name, 'chunks_archive.jsonl')
+        if needs_rebuild(archive_path, *(self._chunked_data_path(channel_name, video_id) for video_id in video_ids)):
+            return list(video_ids)
+        
+        texts = defaultdict(list)
+        for chunk in iter_jsonl(archive_path):
+            texts[chunk['video_id']].append(chunk['text'])
+        
+        return [
+            {'video_id': video_id, 'texts': texts[video_id]} if video_id in texts else video_id
+            for video_id in video_ids
+        ]
+    
+    def iter_embed_videos(self, channel_name: str, videos: Iterable[Union[str, Dict[str, Any]]],
+                          batch_chunks: Optional[int] = 1024) -> Iterator[Dict[str, Any]]:
+        """
+        Embed videos as they arrive, yielding the embedding result for each.
+        
+        Videos are buffered until they hold at least batch_chunks chunks and
+        then embedded together. Videos whose embeddings are newer than their
+        chunked data and were made with the same model are not embedded
+        again. The summary of embedded videos is saved once the input is
+        exhausted.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            videos: YouTube video IDs of chunked videos, or chunker results
+                carrying the chunk texts, which are used without reading
+                the chunk files
+            batch_chunks: Minimum number of chunks per encode call, or None
+                to embed all videos in one call
+            
+        Yields:
+            Embedding result dictionaries
+        """
+        channel_embeddings_dir = os.path.join(self.embeddings_dir, channel_name)
+        summary_path = os.path.join(channel_embeddings_dir, 'embedded_videos_summary.jsonl')
+        
+        # Results of the previous run, reused for videos that are up to date;
+        # older versions saved the summary as a JSON array
+        previous_results = {}
+        previous_summary_path = find_jsonl(summary_path)
+        legacy_summary_path = os.path.join(channel_embeddings_dir, 'embedded_videos_summary.json')
+        if previous_summary_path:
+            previous_results = {result['video_id']: result for result in iter_jsonl(previous_summary_path)}
+        elif os.path.exists(legacy_summary_path):
+            previous_results = {result['video_id']: result for result in read_json(legacy_summary_path)}
+        
+        def load(video: Union[str, Dict[str, Any]]) -> Tuple[str, Optional[List[str]], Optional[Dict[str, Any]]]:
+            video_id = video if isinstance(video, str) else video['video_id']
+            
+            previous_result = previous_results.get(video_id)
+            chunked_data_path = self._chunked_data_path(channel_name, video_id)
+            if (previous_result is not None and previous_result.get('embedding_model') == self.model_name
+                    and chunked_data_path is not None
+                    and not needs_rebuild(self._embeddings_path(channel_name, video_id), chunked_data_path)):
+                return video_id, None, previous_result
+            
+            if isinstance(video, str):
+                return video_id, self._load_texts(channel_name, video_id), None
+            return video_id, video['texts'], None
+        
         embedding_results = []
-        for i, video_id in enumerate(video_ids):
-            logger.info(f"Embedding video {i+1}/{len(video_ids)}: {video_id}")
-            result = self.embed_video_chunks(channel_name, video_id)
-            if result:
-                embedding_results.append(result)
+        batch = []
+        pending_chunks = 0
+        
+        # Chunk files are read ahead, and embeddings written behind, on
+        # threads, so file I/O overlaps with encoding; at most READ_AHEAD
+        # videos are loaded but not yet embedded
+        with ThreadPoolExecutor(max_workers=self.READ_WORKERS) as executor:
+            writes = []
+            
+            def save(path: str, embeddings: np.ndarray) -> None:
+                writes.append(executor.submit(np.save, path, embeddings))
+            
+            for video_id, texts, previous_result in imap_unordered(executor, load, videos, max_pending=self.READ_AHEAD):
+                if previous_result is not None:
+                    logger.info(f"Video {video_id} skipped (up-to-date)")
+                    embedding_results.append(previous_result)
+                    yield previous_result
+                    continue
+                if not texts:
+                    continue
+                batch.append((video_id, texts))
+                pending_chunks += len(texts)
+                
+                if batch_chunks is not None and pending_chunks >= batch_chunks:
+                    for result in self._embed_batch(channel_name, batch, save):
+                        embedding_results.append(result)
+                        yield result
+                    batch = []
+                    pending_chunks = 0
+            
+            if batch:
+                for result in self._embed_batch(channel_name, batch, save):
+                    embedding_results.append(result)
+                    yield result
+            
+            # Every file must be written before the embeddings are merged
+            for write in writes:
+                write.result()
+        
+        # Videos that weren't passed in this time (e.g. skipped by an
+        # incremental refresh) keep their results while their embeddings exist
+        seen_video_ids = {result['video_id'] for result in embedding_results}
+        for video_id, previous_result in previous_results.items():
+            if video_id not in seen_video_ids and os.path.exists(self._embeddings_path(channel_name, video_id)):
+                embedding_results.append(previous_result)
         
         # Create embeddings directory for channel if it doesn't exist
-        channel_embeddings_dir = os.path.join(self.embeddings_dir, channel_name)
         os.makedirs(channel_embeddings_dir, exist_ok=True)
         
-        # Save summary of embedded videos
-        summary_path = os.path.join(channel_embeddings_dir, 'embedded_videos_summary.json')
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(embedding_results, f, ensure_ascii=False, indent=2)
+        # Merge the per-video embeddings for index building
+        self.consolidate_embeddings(channel_name)
+        
+        # Save summary of embedded videos, one video per line
+        summary_path = compressed_path(summary_path)
+        write_jsonl(summary_path, embedding_results)
         
         logger.info(f"Embedded {len(embedding_results)} videos, summary saved to {summary_path}")
-        return embedding_results
+    
+    def _load_video_embeddings(self, channel_name: str,
+                               video_id: str) -> Optional[Tuple[np.ndarray, List[Dict[str, Any]]]]:
+        """Load the embeddings and matching chunks of a video, or None if they don't match."""
+        chunks = self._iter_chunks(channel_name, video_id)
+        if chunks is None:
+            logger.warning(f"Chunked data not found for embedded video {video_id}")
+            return None
+        
+        embeddings = np.load(self._embeddings_path(channel_name, video_id))
+        chunks = list(chunks)
+        if len(chunks) != len(embeddings):
+            logger.warning(f"Embeddings of video {video_id} are out of date, skipping")
+            return None
+        
+        return embeddings, chunks
+    
+    def _append_matrix_rows(self, matrix_path: str, old_rows: int, embedding_arrays: List[np.ndarray]) -> bool:
+        """
+        Grow an .npy matrix in place by appending rows and rewriting its header.
+        
+        Args:
+            matrix_path: Path of the matrix, with old_rows rows
+            old_rows: Number of rows the matrix is known to have
+            embedding_arrays: Rows to append
+            
+        Returns:
+            False, leaving the file untouched, if the matrix can't be grown in place
+        """
+        with open(matrix_path, 'r+b') as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            elif version == (2, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            else:
+                return False
+            data_offset = f.tell()
+            
+            dim = embedding_arrays[0].shape[1]
+            if fortran_order or dtype != self.EMBEDDING_DTYPE or shape != (old_rows, dim):
+                return False
+            
+            # numpy leaves spare room in the header for a longer first dimension;
+            # the new header must have the same length to keep the data in place
+            new_rows = old_rows + sum(len(embeddings) for embeddings in embedding_arrays)
+            header = io.BytesIO()
+            header_data = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                           'shape': (new_rows, dim)}
+            if version == (1, 0):
+                np.lib.format.write_array_header_1_0(header, header_data)
+            else:
+                np.lib.format.write_array_header_2_0(header, header_data)
+            if header.tell() != data_offset:
+                return False
+            
+            # Drop rows a crashed append may have left behind, append the new
+            # rows, then publish them by updating the shape in the header
+            f.truncate(data_offset + old_rows * dim * dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            for embeddings in embedding_arrays:
+                f.write(np.ascontiguousarray(embeddings, dtype=dtype).tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(header.getvalue())
+        
+        return True
+    
+    def consolidate_embeddings(self, channel_name: str) -> int:
+        """
+        Merge the per-video embeddings of a channel into channel-level files.
+        
+        Writes embeddings.npy with one row per chunk and chunks.jsonl with the
+        matching chunk metadata, one chunk per line. The merged videos are
+        tracked in embeddings_manifest.json: if the only change since the last
+        merge is new videos, their rows are appended to embeddings.npy in
+        place; otherwise the files are rewritten under a new manifest ID, which
+        makes the vector database rebuild its index from scratch.
+        
+        Args:
+            channel_name: Name of the channel (without @ symbol)
+            
+        Returns:
+            Number of chunks in the merged files
+        """
+        channel_embeddings_dir = os.path.join(self.embeddings_dir, channel_name)
+        if not os.path.exists(channel_embeddings_dir):
+            return 0
+        
+        matrix_path = os.path.join(channel_embeddings_dir, 'embeddings.npy')
+        chunks_path = os.path.join(channel_embeddings_dir, 'chunks.jsonl')
+        manifest_path = os.path.join(channel_embeddings_dir, 'embeddings_manifest.json')
+        
+        # Modification times of the per-video embeddings
+        video_mtimes = {
+            entry.name[:-len('_embeddings.npy')]: entry.stat().st_mtime_ns
+            for entry in os.scandir(channel_embeddings_dir)
+            if entry.name.endswith('_embeddings.npy')
+        }
+        
+        # Append if every merged video is unchanged
+        manifest = read_json(manifest_path) if os.path.exists(manifest_path) else None
+        old_matrix = None
+        if manifest is not None and os.path.exists(matrix_path) and os.path.exists(chunks_path):
+            old_matrix = np.load(matrix_path, mmap_mode='r')
+            merged_rows = sum(count for _, _, count in manifest['videos'])
+            unchanged = all(video_mtimes.get(video_id) == mtime for video_id, mtime, _ in manifest['videos'])
+            if not unchanged or len(old_matrix) != merged_rows:
+                old_matrix = None
+        
+        if old_matrix is not None:
+            merged = {video_id for video_id, _, _ in manifest['videos']}
+            video_ids = sorted(video_id for video_id in video_mtimes if video_id not in merged)
+        else:
+            manifest = {'id': uuid.uuid4().hex, 'videos': []}
+            video_ids = sorted(video_mtimes)
+        old_rows = len(old_matrix) if old_matrix is not None else 0
+        
+        # Per-video files are loaded in parallel so their reads overlap
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            loaded = list(executor.map(partial(self._load_video_embeddings, channel_name), video_ids))
+        
+        embedding_arrays = []
+        new_chunks = []
+        for video_id, video_embeddings in zip(video_ids, loaded):
+            if video_embeddings is not None:
+                embedding_arrays.append(video_embeddings[0])
+                new_chunks.extend(video_embeddings[1])
+                manifest['videos'].append([video_id, video_mtimes[video_id], len(video_embeddings[1])])
+        
+        if not embedding_arrays:
+            if not old_rows:
+                logger.warning(f"No embeddings to consolidate for channel {channel_name}")
+            return old_rows
+        
+        if old_rows:
+            del old_matrix
+            if not self._append_matrix_rows(matrix_path, old_rows, embedding_arrays):
+                # The header can't hold the new shape; start over under a new ID
+                logger.info(f"Embeddings matrix of channel {channel_name} can't be grown in place, rewriting it")
+                os.remove(manifest_path)
+                return self.consolidate_embeddings(channel_name)
+        else:
+            # Fill a preallocated on-disk matrix instead of concatenating in
+            # memory, and swap it in once complete
+            tmp_path = matrix_path + '.tmp'
+            matrix = np.lib.format.open_memmap(
+                tmp_path,
+                mode='w+',
+                dtype=self.EMBEDDING_DTYPE,
+                shape=(len(new_chunks), embedding_arrays[0].shape[1])
+            )
+            row = 0
+            for embeddings in embedding_arrays:
+                matrix[row:row + len(embeddings)] = embeddings
+                row += len(embeddings)
+            matrix.flush()
+            del matrix
+            os.replace(tmp_path, matrix_path)
+        
+        if old_rows:
+            with open(chunks_path, 'ab') as f:
+                f.write(dumps_jsonl(new_chunks))
+        else:
+            write_jsonl(chunks_path, new_chunks)
+        write_json(manifest_path, manifest, indent=False)
+        
+        logger.info(f"Consolidated {len(new_chunks)} new chunk embeddings for channel {channel_name} "
+                    f"({old_rows + len(new_chunks)} in total)")
+        return old_rows + len(new_chunks)
@@ -0,0 +1,41 @@
+"""
+Embedding Models Module
+
+This module loads sentence-transformers models once per process and shares
+them between the embedder and the query processor.
+"""
+
+import logging
+import threading
+import torch
+from typing import Dict
+from sentence_transformers import SentenceTransformer
+
+# Logging is configured by the application, not by this module
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Loaded embedding models by name
+_MODELS: Dict[str, SentenceTransformer] = {}
+_MODELS_LOCK = threading.Lock()
+
+def get_model(model_name: str) -> SentenceTransformer:
+    """
+    Get the shared instance of an embedding model, loading it on first use.
+    
+    Args:
+        model_name: Name of the sentence-transformers model
+        
+    Returns:
+        Loaded model, on the GPU with half precision inference when available
+    """
+    with _MODELS_LOCK:
+        model = _MODELS.get(model_name)
+        if model is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            logger.info(f"Loading embedding model: {model_name} on {device}")
+            model = SentenceTransformer(model_name, device=device)
+            if device == 'cuda':
+                model.half()
+            _MODELS[model_name] = model
+        return model
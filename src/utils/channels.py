@@ -0,0 +1,25 @@
+"""
+Channels Module
+
+This module canonicalizes YouTube channel handles, so that every component
+derives the same channel name (and data directories) from a handle.
+"""
+
+
+def channel_name_from_handle(channel_handle: str) -> str:
+    """
+    Get the channel name (without @ symbol) from a channel handle.
+    
+    Args:
+        channel_handle: YouTube channel handle, with or without @ (e.g., @ManusAGI)
+        
+    Returns:
+        Channel name, e.g. ManusAGI
+        
+    Raises:
+        ValueError: If the channel handle is empty
+    """
+    channel_name = channel_handle.strip().lstrip('@')
+    if not channel_name:
+        raise ValueError(f"Invalid channel handle: {channel_handle!r}")
+    return channel_name
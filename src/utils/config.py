@@ -5,23 +5,78 @@ This module manages system configuration, including refresh mode settings.
 """
 
 import os
-import json
+import time
+import atexit
+import re
+import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional, Tuple
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.utils.json_utils import dumps, read_json
+
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Settings overridden in the current context, see override()
+_override: ContextVar[Optional[Dict[str, Any]]] = ContextVar('cfg_override', default=None)
+
+# Types of the values in flat configuration files; other values are strings
+_FLAT_SCHEMA = {
+    'last_refresh': float,
+    'auto_refresh_interval_days': int
+}
+
+# Escapes of backslashes and line breaks in flat configuration values
+_FLAT_ESCAPES = {'\\': '\\\\', '\n': '\\n', '\r': '\\r'}
+_FLAT_UNESCAPES = {escape: char for char, escape in _FLAT_ESCAPES.items()}
+_FLAT_ESCAPE_RE = re.compile(r'[\\\n\r]')
+_FLAT_UNESCAPE_RE = re.compile(r'\\[\\nr]')
+
+def _dumps_flat(config: Dict[str, Any]) -> bytes:
+    """Serialize a configuration to key=value lines; None values are left out."""
+    return ''.join(
+        f'{key}={_FLAT_ESCAPE_RE.sub(lambda m: _FLAT_ESCAPES[m.group()], str(value))}\n'
+        for key, value in config.items()
+        if value is not None
+    ).encode('utf-8')
+
+def _loads_flat(data: bytes) -> Dict[str, Any]:
+    """
+    Deserialize a configuration from key=value lines.
+    
+    Raises:
+        ValueError: If a line is not a key=value pair or a value has the wrong type
+    """
+    config = {}
+    for line in data.decode('utf-8').split('\n'):
+        if not line:
+            continue
+        key, sep, value = line.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid configuration line: {line!r}")
+        config[key] = _FLAT_UNESCAPE_RE.sub(lambda m: _FLAT_UNESCAPES[m.group()], value)
+    for key, value_type in _FLAT_SCHEMA.items():
+        if key in config:
+            config[key] = value_type(config[key])
+    return config
 
 class ConfigManager:
     """
     Manager for system configuration.
     """
     
+    # Seconds a should_refresh() result is reused for
+    SHOULD_REFRESH_TTL = 60.0
+    
+    # Store the configuration as flat key=value lines instead of JSON; the
+    # settings are all scalars, which a line split parses faster than JSON
+    FLAT_FORMAT = os.environ.get('YTAI_FLAT_CONFIG') == '1'
+    
     def __init__(self, base_dir: str):
         """
         Initialize the configuration manager.
@@ -31,14 +86,41 @@ class ConfigManager:
         """
         self.base_dir = base_dir
         self.config_dir = os.path.join(base_dir, 'data', 'config')
-        self.config_file = os.path.join(self.config_dir, 'system_config.json')
+        self.json_config_file = os.path.join(self.config_dir, 'system_config.json')
+        if self.FLAT_FORMAT:
+            self.config_file = os.path.join(self.config_dir, 'system_config.conf')
+        else:
+            self.config_file = self.json_config_file
         
         # Create config directory if it doesn't exist
         os.makedirs(self.config_dir, exist_ok=True)
         
+        # Setters only update self.config; changes are written by flush()
+        self._dirty = False
+        
+        # Guards self.config, the dirty flag and the should_refresh() cache
+        # across threads
+        self._lock = threading.Lock()
+        
+        # Hash and file modification time of the configuration as last
+        # loaded or saved
+        self._content_hash: Optional[bytes] = None
+        self._mtime_ns: Optional[int] = None
+        
+        # Cleared when the configuration file can't be parsed, so the
+        # defaults used instead never overwrite the user's settings
+        self._writable = True
+        
         # Load or create config
         self.config = self._load_config()
         
+        # should_refresh() result with the monotonic time it expires at,
+        # reset when a setting changes
+        self._should_refresh_cache: Optional[Tuple[float, bool]] = None
+        
+        # Unflushed changes are written when the interpreter exits
+        atexit.register(self.flush)
+        
         logger.info(f"Initialized configuration manager")
     
     def _load_config(self) -> Dict[str, Any]:
@@ -48,45 +130,185 @@ class ConfigManager:
         Returns:
             Configuration dictionary
         """
+        self._writable = True
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                if self.FLAT_FORMAT:
+                    with open(self.config_file, 'rb') as f:
+                        config = _loads_flat(f.read())
+                else:
+                    config = read_json(self.config_file)
                 logger.info(f"Loaded configuration from {self.config_file}")
+                self._content_hash = self._hash_config(config)
+                self._mtime_ns = os.stat(self.config_file).st_mtime_ns
+                
+                # Last refresh used to be stored as an ISO format string
+                if isinstance(config.get('last_refresh'), str):
+                    config['last_refresh'] = datetime.fromisoformat(config['last_refresh']).timestamp()
+                    self._dirty = True
+                
                 return config
             except Exception as e:
                 logger.error(f"Error loading configuration: {str(e)}")
+                self._writable = False
+        
+        # Switching to the flat format keeps the settings of the JSON file
+        elif self.FLAT_FORMAT and os.path.exists(self.json_config_file):
+            try:
+                config = read_json(self.json_config_file)
+                logger.info(f"Loaded configuration from {self.json_config_file}")
+                if isinstance(config.get('last_refresh'), str):
+                    config['last_refresh'] = datetime.fromisoformat(config['last_refresh']).timestamp()
+                self._save_config(config)
+                return config
+            except Exception as e:
+                logger.error(f"Error loading configuration: {str(e)}")
+                self._writable = False
         
         # Create default configuration
         default_config = {
             'refresh_mode': 'manual',  # 'auto' or 'manual'
-            'last_refresh': datetime.now().isoformat(),
+            'last_refresh': time.time(),  # Seconds since the epoch
             'auto_refresh_interval_days': 7,
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat()
         }
         
-        # Save default configuration
-        self._save_config(default_config)
-        
-        logger.info(f"Created default configuration")
+        # Save default configuration, unless the existing file failed to parse
+        if self._writable:
+            self._save_config(default_config)
+            logger.info(f"Created default configuration")
+        else:
+            logger.warning(f"Using default configuration; {self.config_file} is left unchanged")
         return default_config
     
-    def _save_config(self, config: Dict[str, Any]) -> None:
+    @staticmethod
+    def _hash_config(config: Dict[str, Any]) -> bytes:
+        """Hash the settings of a configuration, ignoring its update time."""
+        settings = {key: value for key, value in config.items() if key != 'updated_at'}
+        return hashlib.blake2b(dumps(settings), digest_size=8).digest()
+    
+    def _save_config(self, config: Dict[str, Any]) -> bool:
         """
-        Save configuration to file.
+        Save configuration to file, unless it is unchanged since it was last
+        loaded or saved.
         
         Args:
             config: Configuration dictionary
+            
+        Returns:
+            Boolean indicating whether the file holds the configuration
         """
+        if not self._writable:
+            logger.warning(f"Not saving configuration: {self.config_file} could not be parsed")
+            return False
+        
+        content_hash = self._hash_config(config)
+        if content_hash == self._content_hash:
+            return True
+        
         # Update timestamp
         config['updated_at'] = datetime.now().isoformat()
         
-        # Save to file
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        # Written under a temporary name first, so a crash mid-write doesn't
+        # leave a truncated file behind
+        tmp_path = self.config_file + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_dumps_flat(config) if self.FLAT_FORMAT else dumps(config, indent=True))
+        os.replace(tmp_path, self.config_file)
+        self._content_hash = content_hash
+        self._mtime_ns = os.stat(self.config_file).st_mtime_ns
         
-        logger.info(f"Saved configuration to {self.config_file}")
+        logger.debug("Saved configuration to %s", self.config_file)
+        return True
+    
+    def _set(self, key: str, value: Any) -> bool:
+        """
+        Set a configuration value without writing it to file.
+        
+        Args:
+            key: Configuration key
+            value: New value
+            
+        Returns:
+            Boolean indicating whether the value changed
+        """
+        with self._lock:
+            if self.config.get(key) == value:
+                return False
+            
+            self.config[key] = value
+            self._dirty = True
+            self._should_refresh_cache = None
+            return True
+    
+    def flush(self) -> None:
+        """
+        Write the configuration to file if it changed since the last write.
+        
+        Changes stay pending, rather than being dropped, while the
+        configuration file can't be parsed.
+        """
+        with self._lock:
+            # Changes stay pending if the file can't be written
+            if self._dirty and self._save_config(self.config):
+                self._dirty = False
+    
+    def reload(self) -> bool:
+        """
+        Reload the configuration if its file was modified since it was last
+        loaded or saved (e.g. by another process). Unflushed changes are
+        discarded on reload.
+        
+        Returns:
+            Boolean indicating whether the configuration was reloaded
+        """
+        try:
+            mtime_ns = os.stat(self.config_file).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        
+        with self._lock:
+            if mtime_ns == self._mtime_ns:
+                return False
+            
+            self._dirty = False
+            self.config = self._load_config()
+            self._should_refresh_cache = None
+            return True
+    
+    def close(self) -> None:
+        """
+        Flush the configuration and stop flushing it at interpreter exit, so a
+        discarded manager can't later overwrite newer settings.
+        """
+        self.flush()
+        atexit.unregister(self.flush)
+    
+    @classmethod
+    def reset_cache(cls) -> None:
+        """
+        Close and forget the managers shared by get_config_manager, so the
+        next call reloads the configuration from file.
+        """
+        with _managers_lock:
+            managers = list(_managers.values())
+            _managers.clear()
+        for manager in managers:
+            manager.close()
+    
+    def __enter__(self) -> 'ConfigManager':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
+    
+    def _settings(self) -> Dict[str, Any]:
+        """Get the configuration with the overrides of the current context applied."""
+        overrides = _override.get()
+        if overrides is None:
+            return self.config
+        return {**self.config, **overrides}
     
     def get_refresh_mode(self) -> str:
         """
@@ -95,7 +317,7 @@ class ConfigManager:
         Returns:
             Refresh mode ('auto' or 'manual')
         """
-        return self.config.get('refresh_mode', 'manual')
+        return self._settings().get('refresh_mode', 'manual')
     
     def set_refresh_mode(self, mode: str) -> None:
         """
@@ -107,10 +329,8 @@ class ConfigManager:
         if mode not in ['auto', 'manual']:
             raise ValueError(f"Invalid refresh mode: {mode}")
         
-        self.config['refresh_mode'] = mode
-        self._save_config(self.config)
-        
-        logger.info(f"Set refresh mode to {mode}")
+        if self._set('refresh_mode', mode):
+            logger.debug("Set refresh mode to %s", mode)
     
     def get_last_refresh(self) -> datetime:
         """
@@ -119,10 +339,14 @@ class ConfigManager:
         Returns:
             Datetime of last refresh
         """
-        last_refresh_str = self.config.get('last_refresh')
-        if last_refresh_str:
-            return datetime.fromisoformat(last_refresh_str)
-        return datetime.now() - timedelta(days=30)  # Default to long ago
+        return datetime.fromtimestamp(self._last_refresh_timestamp())
+    
+    def _last_refresh_timestamp(self) -> float:
+        """Get last refresh time in seconds since the epoch."""
+        last_refresh = self._settings().get('last_refresh')
+        if last_refresh is not None:
+            return last_refresh
+        return time.time() - 30 * 86400  # Default to long ago
     
     def set_last_refresh(self, timestamp: Optional[datetime] = None) -> None:
         """
@@ -134,10 +358,8 @@ class ConfigManager:
         if timestamp is None:
             timestamp = datetime.now()
         
-        self.config['last_refresh'] = timestamp.isoformat()
-        self._save_config(self.config)
-        
-        logger.info(f"Set last refresh to {timestamp.isoformat()}")
+        if self._set('last_refresh', timestamp.timestamp()):
+            logger.debug("Set last refresh to %s", timestamp)
     
     def get_auto_refresh_interval(self) -> int:
         """
@@ -146,7 +368,7 @@ class ConfigManager:
         Returns:
             Number of days between auto refreshes
         """
-        return self.config.get('auto_refresh_interval_days', 7)
+        return self._settings().get('auto_refresh_interval_days', 7)
     
     def set_auto_refresh_interval(self, days: int) -> None:
         """
@@ -158,27 +380,82 @@ class ConfigManager:
         if days < 1:
             raise ValueError(f"Invalid refresh interval: {days}")
         
-        self.config['auto_refresh_interval_days'] = days
-        self._save_config(self.config)
-        
-        logger.info(f"Set auto refresh interval to {days} days")
+        if self._set('auto_refresh_interval_days', days):
+            logger.debug("Set auto refresh interval to %d days", days)
     
     def should_refresh(self) -> bool:
         """
         Check if channel should be refreshed based on mode and last refresh.
         
+        In auto mode, the result is reused for SHOULD_REFRESH_TTL seconds
+        unless a setting changes in the meantime (or settings are overridden).
+        
         Returns:
             Boolean indicating whether refresh is needed
         """
-        # If manual mode, don't auto-refresh
-        if self.get_refresh_mode() == 'manual':
-            return False
+        overrides = _override.get()
+        config = self.config if overrides is None else {**self.config, **overrides}
         
-        # If auto mode, check if interval has passed
-        last_refresh = self.get_last_refresh()
-        interval_days = self.get_auto_refresh_interval()
+        # If manual mode (the default), don't auto-refresh
+        if config.get('refresh_mode') != 'auto':
+            return False
         
-        now = datetime.now()
-        next_refresh = last_refresh + timedelta(days=interval_days)
+        # The cache is checked and filled under the lock, so a setting
+        # changed meanwhile can't be overwritten by a stale result
+        with self._lock:
+            now_monotonic = time.monotonic()
+            if overrides is None and self._should_refresh_cache is not None and now_monotonic < self._should_refresh_cache[0]:
+                return self._should_refresh_cache[1]
+            
+            # If auto mode, check if interval has passed, against the
+            # configuration as of now in case it was reloaded meanwhile
+            if overrides is None:
+                config = self.config
+            last_refresh = config.get('last_refresh')
+            elapsed = time.time() - last_refresh if last_refresh is not None else 30 * 86400
+            result = elapsed >= config.get('auto_refresh_interval_days', 7) * 86400
+            
+            if overrides is None:
+                self._should_refresh_cache = (now_monotonic + self.SHOULD_REFRESH_TTL, result)
+            return result
+
+
+# Managers shared by get_config_manager, per base directory
+_managers: Dict[str, ConfigManager] = {}
+_managers_lock = threading.Lock()
+
+def get_config_manager(base_dir: str) -> ConfigManager:
+    """
+    Get the configuration manager of a project, shared within the process.
+    
+    Args:
+        base_dir: Base directory of the project
         
-        return now >= next_refresh
+    Returns:
+        Configuration manager
+    """
+    with _managers_lock:
+        manager = _managers.get(base_dir)
+        if manager is None:
+            manager = _managers[base_dir] = ConfigManager(base_dir)
+        return manager
+
+
+@contextmanager
+def override(**settings: Any) -> Iterator[None]:
+    """
+    Override configuration settings within a context, without changing or
+    saving the configuration (e.g. to run one refresh in auto mode).
+    
+    Overrides apply to the getters of every configuration manager in the
+    current thread or task, and nest.
+    
+    Args:
+        settings: Configuration keys and values, e.g. refresh_mode='auto'
+            or last_refresh as seconds since the epoch
+    """
+    token = _override.set({**(_override.get() or {}), **settings})
+    try:
+        yield
+    finally:
+        _override.reset(token)
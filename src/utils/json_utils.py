@@ -0,0 +1,182 @@
+"""
+JSON Utilities Module
+
+This module provides fast JSON serialization helpers backed by orjson,
+falling back to the standard library json module when orjson is not installed.
+Newline-delimited JSON files can be zstd-compressed when zstandard is installed.
+"""
+
+import io
+import os
+import json
+import mmap
+from typing import Any, Iterable, Iterator, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Suffix of zstd-compressed files
+ZSTD_SUFFIX = '.zst'
+
+# Files at least this large are parsed from a memory map instead of a copy
+_MMAP_MIN_SIZE = 1 << 20
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON.
+
+    Args:
+        obj: Object to serialize
+        indent: Whether to pretty-print with two-space indentation
+
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Deserialize a JSON document.
+
+    Args:
+        data: JSON document as bytes or str
+
+    Returns:
+        Deserialized object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def write_json(path: str, obj: Any, indent: bool = True) -> None:
+    """
+    Write an object to a JSON file.
+
+    Args:
+        path: Path of the file to write
+        obj: Object to serialize
+        indent: Whether to pretty-print with two-space indentation
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, indent=indent))
+
+
+def read_json(path: str) -> Any:
+    """
+    Read an object from a JSON file.
+
+    Large files are memory-mapped and parsed in place when orjson is
+    available, instead of first being copied into a bytes object.
+
+    Args:
+        path: Path of the file to read
+
+    Returns:
+        Deserialized object
+    """
+    with open(path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= _MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return orjson.loads(view)
+        return loads(f.read())
+
+
+def dumps_jsonl(rows: Iterable[Any], compress: bool = False) -> bytes:
+    """
+    Serialize objects to newline-delimited JSON, one object per line.
+
+    Args:
+        rows: Objects to serialize
+        compress: Whether to zstd-compress the output
+
+    Returns:
+        Newline-delimited JSON document as bytes
+    """
+    data = b''.join(dumps(row) + b'\n' for row in rows)
+    if compress:
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def write_jsonl(path: str, rows: Iterable[Any]) -> None:
+    """
+    Write objects to a newline-delimited JSON file, one object per line.
+
+    The file is zstd-compressed if the path ends with ZSTD_SUFFIX.
+
+    Args:
+        path: Path of the file to write
+        rows: Objects to serialize
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps_jsonl(rows, compress=path.endswith(ZSTD_SUFFIX)))
+
+
+def iter_jsonl(path: str) -> Iterator[Any]:
+    """
+    Iterate over the objects in a newline-delimited JSON file.
+
+    The file is decompressed on the fly if the path ends with ZSTD_SUFFIX.
+
+    Args:
+        path: Path of the file to read
+
+    Yields:
+        Deserialized objects, one per non-empty line
+    """
+    with open(path, 'rb') as f:
+        if path.endswith(ZSTD_SUFFIX):
+            lines = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(f), encoding='utf-8')
+        else:
+            lines = f
+        for line in lines:
+            if line.strip():
+                yield loads(line)
+
+
+def compressed_path(path: str) -> str:
+    """
+    Get the path a compressible file should be written to.
+
+    Args:
+        path: Path of the uncompressed file
+
+    Returns:
+        Path with ZSTD_SUFFIX appended if zstandard is available, else path
+    """
+    return path + ZSTD_SUFFIX if zstandard is not None else path
+
+
+def find_jsonl(path: str) -> Optional[str]:
+    """
+    Find an existing newline-delimited JSON file, compressed or not.
+
+    Args:
+        path: Path of the uncompressed file
+
+    Returns:
+        Path of the compressed file if it exists, else path if it exists, else None
+    """
+    if zstandard is not None and os.path.exists(path + ZSTD_SUFFIX):
+        return path + ZSTD_SUFFIX
+    if os.path.exists(path):
+        return path
+    return None
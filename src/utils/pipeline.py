@@ -0,0 +1,181 @@
+"""
+Pipeline Module
+
+This module runs channel processing stages concurrently, streaming videos
+from one stage to the next through bounded queues so that crawling,
+processing, chunking and embedding overlap instead of running back to back.
+"""
+
+import os
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+# Logging is configured by the application, not by this module
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Marks the end of a stage's output
+_END = object()
+
+Stage = Callable[[Iterable[Any]], Iterable[Any]]
+
+
+def _drain(q: queue.Queue) -> Iterator[Any]:
+    """Yield items from a queue until the end marker."""
+    while True:
+        item = q.get()
+        if item is _END:
+            return
+        yield item
+
+
+def run_pipeline(source: Iterable[Any], stages: List[Stage], maxsize: int = 8) -> List[Any]:
+    """
+    Stream items from a source through a chain of stages.
+    
+    Each stage is a function that takes an iterable of input items and
+    returns an iterable of output items, and runs on its own thread. Stages
+    are connected by bounded queues, so no stage runs more than maxsize items
+    ahead of the next one.
+    
+    Args:
+        source: Items fed into the first stage
+        stages: Stage functions, in order
+        maxsize: Maximum number of items buffered between two stages
+        
+    Returns:
+        List of items produced by the last stage
+        
+    Raises:
+        Exception: The first exception raised by the source or a stage,
+            once all stages have stopped
+    """
+    queues = [queue.Queue(maxsize=maxsize) for _ in range(len(stages) + 1)]
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    
+    def produce() -> None:
+        try:
+            for item in source:
+                if stop.is_set():
+                    break
+                queues[0].put(item)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            queues[0].put(_END)
+    
+    def consume(stage: Stage, q_in: queue.Queue, q_out: queue.Queue) -> None:
+        items = _drain(q_in)
+        try:
+            for item in stage(items):
+                q_out.put(item)
+        except BaseException as e:
+            logger.error(f"Pipeline stage {getattr(stage, '__name__', stage)} failed: {str(e)}")
+            errors.append(e)
+            stop.set()
+        finally:
+            # Keep draining so upstream stages never block on a full queue
+            for _ in items:
+                pass
+            q_out.put(_END)
+    
+    threads = [threading.Thread(target=produce, daemon=True)]
+    for i, stage in enumerate(stages):
+        threads.append(threading.Thread(target=consume, args=(stage, queues[i], queues[i + 1]), daemon=True))
+    
+    for thread in threads:
+        thread.start()
+    
+    results = list(_drain(queues[-1]))
+    
+    for thread in threads:
+        thread.join()
+    
+    if errors:
+        raise errors[0]
+    
+    return results
+
+
+def imap_unordered(executor: Executor, fn: Callable[[Any], Any], items: Iterable[Any],
+                   max_pending: int = 16) -> Iterator[Any]:
+    """
+    Apply a function to items on an executor, yielding results as they complete.
+    
+    Items are submitted lazily, with at most max_pending in flight, so the
+    input can be a stream. Finished results are yielded as soon as the next
+    item is submitted, without waiting for the pending limit.
+    
+    Args:
+        executor: Executor to run the function on
+        fn: Function to apply (must be picklable for process executors)
+        items: Input items
+        max_pending: Maximum number of submitted but unfinished items
+        
+    Yields:
+        Results in completion order
+    """
+    pending = set()
+    for item in items:
+        pending.add(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        else:
+            done = {future for future in pending if future.done()}
+            pending -= done
+        for future in done:
+            yield future.result()
+    
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """
+    Create a process pool for CPU-bound stages.
+    
+    Workers are spawned rather than forked, so they don't inherit the
+    threads (and model) of the parent process, and one core is left for
+    the parent.
+    
+    Returns:
+        Process pool executor
+    """
+    workers = max(1, (os.cpu_count() or 2) - 1)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def needs_rebuild(target: str, *sources: Optional[str]) -> bool:
+    """
+    Check whether a stage's output file is missing or older than its inputs.
+    
+    Args:
+        target: Path of the output file
+        sources: Paths of the input files; missing (or None) inputs are ignored
+        
+    Returns:
+        True if the target doesn't exist or an input was modified after it
+    """
+    try:
+        target_mtime = os.stat(target).st_mtime_ns
+    except FileNotFoundError:
+        return True
+    
+    for source in sources:
+        if source is None:
+            continue
+        try:
+            if os.stat(source).st_mtime_ns > target_mtime:
+                return True
+        except FileNotFoundError:
+            continue
+    
+    return False
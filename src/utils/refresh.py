@@ -6,40 +6,55 @@ This module manages the channel refresh process, including auto and manual modes
 
 import os
 import logging
-from datetime import datetime
+from datetime import timedelta
 from typing import Dict, Any, Optional
 
-from src.utils.config import ConfigManager
-from src.ingestion.crawler import YouTubeChannelCrawler
-from src.processing.processor import VideoProcessor
-from src.semantic.chunker import ContentChunker
-from src.semantic.embedder import ContentEmbedder
-from src.memory.vector_db import VectorDatabase
+from src.utils.config import get_config_manager
+from src.utils.json_utils import find_jsonl, read_json, write_json
+from src.utils.pipeline import needs_rebuild, process_pool, run_pipeline
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Logging is configured by the application, not by this module
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class RefreshManager:
     """
     Manager for channel refresh operations.
     """
     
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, batch_size: Optional[int] = None):
         """
         Initialize the refresh manager.
         
         Args:
             base_dir: Base directory of the project
+            batch_size: Number of chunk texts per embedding model forward
+                pass (defaults to the embedder's default)
         """
         self.base_dir = base_dir
-        self.config_manager = ConfigManager(base_dir)
+        self.batch_size = batch_size
+        
+        # Data directories of the pipeline stages
+        self._data_dir = os.path.join(base_dir, 'data')
+        self._raw_dir = os.path.join(self._data_dir, 'raw')
+        self._processed_dir = os.path.join(self._data_dir, 'processed')
+        self._embeddings_dir = os.path.join(self._data_dir, 'embeddings')
+        self._index_dir = os.path.join(self._data_dir, 'index')
+        
+        self.config_manager = get_config_manager(base_dir)
         
         logger.info(f"Initialized refresh manager")
     
+    def __getattr__(self, name: str) -> Any:
+        """
+        Delegate other attributes (e.g. get_refresh_mode, set_refresh_mode)
+        to the configuration manager.
+        """
+        # Guard against recursion before config_manager is set
+        if name == 'config_manager':
+            raise AttributeError(name)
+        return getattr(self.config_manager, name)
+    
     def toggle_refresh_mode(self) -> str:
         """
         Toggle between auto and manual refresh modes.
@@ -51,29 +66,11 @@ class RefreshManager:
         new_mode = 'manual' if current_mode == 'auto' else 'auto'
         
         self.config_manager.set_refresh_mode(new_mode)
+        self.config_manager.flush()
         logger.info(f"Toggled refresh mode from {current_mode} to {new_mode}")
         
         return new_mode
     
-    def set_refresh_mode(self, mode: str) -> None:
-        """
-        Set refresh mode explicitly.
-        
-        Args:
-            mode: Refresh mode ('auto' or 'manual')
-        """
-        self.config_manager.set_refresh_mode(mode)
-        logger.info(f"Set refresh mode to {mode}")
-    
-    def get_refresh_mode(self) -> str:
-        """
-        Get current refresh mode.
-        
-        Returns:
-            Current refresh mode
-        """
-        return self.config_manager.get_refresh_mode()
-    
     def check_auto_refresh(self, channel_handle: str) -> bool:
         """
         Check if auto refresh is needed and perform if necessary.
@@ -94,78 +91,124 @@ class RefreshManager:
         success = self.refresh_channel(channel_handle)
         
         if success:
-            # Update last refresh timestamp
-            self.config_manager.set_last_refresh()
+            # refresh_channel has already recorded and flushed the refresh time
             logger.info("Auto refresh completed successfully")
         else:
             logger.error("Auto refresh failed")
         
         return success
     
-    def refresh_channel(self, channel_handle: str) -> bool:
+    def refresh_channel(self, channel_handle: str, force_refresh: bool = False) -> bool:
         """
         Refresh channel data by crawling, processing, and indexing.
         
         Args:
             channel_handle: YouTube channel handle (e.g., @ManusAGI)
+            force_refresh: Re-crawl videos even if they were crawled recently
             
         Returns:
             Boolean indicating success
         """
+        crawler = None
         try:
             logger.info(f"Starting refresh for channel {channel_handle}")
             
-            # Extract channel name from handle
-            channel_name = channel_handle.replace('@', '')
+            # Pipeline modules are imported here, so switching or checking
+            # the refresh mode doesn't load torch, faiss and crawl4ai
+            from src.ingestion.crawler import YouTubeChannelCrawler
+            from src.processing.processor import VideoProcessor
+            from src.semantic.chunker import ContentChunker
+            from src.semantic.embedder import ContentEmbedder
+            from src.memory.vector_db import VectorDatabase
             
             # Initialize components
             crawler = YouTubeChannelCrawler(
                 channel_handle=channel_handle,
-                output_dir=os.path.join(self.base_dir, 'data')
+                output_dir=self._data_dir,
+                force_refresh=force_refresh
             )
+            channel_name = crawler.channel_name
             
             processor = VideoProcessor(
-                raw_data_dir=os.path.join(self.base_dir, 'data', 'raw'),
-                processed_data_dir=os.path.join(self.base_dir, 'data', 'processed')
+                raw_data_dir=self._raw_dir,
+                processed_data_dir=self._processed_dir
             )
             
             chunker = ContentChunker(
-                processed_data_dir=os.path.join(self.base_dir, 'data', 'processed'),
-                chunked_data_dir=os.path.join(self.base_dir, 'data', 'embeddings')
+                processed_data_dir=self._processed_dir,
+                chunked_data_dir=self._embeddings_dir
             )
             
             embedder = ContentEmbedder(
-                chunked_data_dir=os.path.join(self.base_dir, 'data', 'embeddings'),
-                embeddings_dir=os.path.join(self.base_dir, 'data', 'embeddings')
+                chunked_data_dir=self._embeddings_dir,
+                embeddings_dir=self._embeddings_dir,
+                batch_size=self.batch_size
             )
             
             vector_db = VectorDatabase(
-                embeddings_dir=os.path.join(self.base_dir, 'data', 'embeddings'),
-                index_dir=os.path.join(self.base_dir, 'data', 'index')
+                embeddings_dir=self._embeddings_dir,
+                index_dir=self._index_dir
             )
             
-            # Crawl channel
+            # Crawl channel metadata
             logger.info(f"Crawling channel {channel_handle}")
-            crawl_result = crawler.crawl_channel()
-            
-            # Process videos
-            logger.info(f"Processing videos for channel {channel_name}")
-            process_result = processor.process_channel_videos(channel_name)
-            
-            # Chunk content
-            logger.info(f"Chunking content for channel {channel_name}")
-            chunk_result = chunker.process_channel_videos(channel_name)
-            
-            # Generate embeddings
-            logger.info(f"Generating embeddings for channel {channel_name}")
-            embed_result = embedder.process_channel_videos(channel_name)
+            channel_data = crawler.crawl_channel_metadata()
+            
+            # Videos in the last index, built with the same model, whose raw
+            # data is unchanged since don't go through the pipeline again
+            indexed_videos_path = os.path.join(self._index_dir, channel_name, 'indexed_videos.json')
+            indexed_video_ids = set()
+            if os.path.exists(indexed_videos_path):
+                indexed_videos = read_json(indexed_videos_path)
+                if indexed_videos.get('embedding_model') == embedder.model_name:
+                    indexed_video_ids = set(indexed_videos['video_ids'])
+            
+            crawled_video_ids = []
+            skipped_video_ids = []
+            
+            def crawled_videos():
+                for video_data in crawler.iter_videos():
+                    video_id = video_data['video_id']
+                    crawled_video_ids.append(video_id)
+                    # Freshly crawled videos carry their transcript
+                    if ('transcript' not in video_data and video_id in indexed_video_ids
+                            and not self._raw_video_changed(channel_name, video_id, indexed_videos_path)):
+                        skipped_video_ids.append(video_id)
+                        continue
+                    yield video_data
+            
+            # Process, chunk and embed each video as soon as it is crawled,
+            # so the stages overlap instead of running back to back.
+            # Processing and chunking are CPU-bound and run on worker
+            # processes; embedding stays in this process, which owns the model.
+            # Processed videos and chunk texts are handed from stage to stage
+            # in memory; the files written along the way aren't read back.
+            logger.info(f"Crawling, processing, chunking and embedding videos for channel {channel_name}")
+            with process_pool() as pool:
+                embed_result = run_pipeline(crawled_videos(), [
+                    lambda videos: processor.iter_process_videos(channel_name, videos, executor=pool),
+                    lambda videos: chunker.iter_chunk_videos(channel_name, videos, executor=pool),
+                    lambda videos: embedder.iter_embed_videos(channel_name, videos)
+                ])
+            
+            crawler.save_crawl_summary(channel_data, len(crawled_video_ids))
+            logger.info(f"Embedded {len(embed_result)} of {len(crawled_video_ids)} crawled videos "
+                        f"({len(skipped_video_ids)} already indexed)")
             
             # Build index
             logger.info(f"Building index for channel {channel_name}")
             index_result = vector_db.build_index(channel_name)
             
+            if index_result:
+                indexed_video_ids = skipped_video_ids + [result['video_id'] for result in embed_result]
+                write_json(indexed_videos_path, {
+                    'embedding_model': embedder.model_name,
+                    'video_ids': sorted(indexed_video_ids)
+                }, indent=False)
+            
             # Update last refresh timestamp
             self.config_manager.set_last_refresh()
+            self.config_manager.flush()
             
             logger.info(f"Refresh completed for channel {channel_handle}")
             return True
@@ -173,6 +216,19 @@ class RefreshManager:
         except Exception as e:
             logger.error(f"Error refreshing channel {channel_handle}: {str(e)}", exc_info=True)
             return False
+        
+        finally:
+            if crawler is not None:
+                crawler.close()
+    
+    def _raw_video_changed(self, channel_name: str, video_id: str, indexed_videos_path: str) -> bool:
+        """Check whether a video's raw data was modified after the index was last built."""
+        raw_video_dir = os.path.join(self._raw_dir, channel_name, 'videos', video_id)
+        return needs_rebuild(
+            indexed_videos_path,
+            os.path.join(raw_video_dir, 'video_data.json'),
+            find_jsonl(os.path.join(raw_video_dir, 'transcript.jsonl'))
+        )
     
     def get_refresh_status(self) -> Dict[str, Any]:
         """
@@ -188,7 +244,6 @@ class RefreshManager:
         # Calculate next refresh if in auto mode
         next_refresh = None
         if mode == 'auto':
-            from datetime import timedelta
             next_refresh = last_refresh + timedelta(days=interval)
         
         return {
@@ -0,0 +1,45 @@
+"""
+Tests for the flat key=value configuration format.
+"""
+
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import ConfigManager, _dumps_flat, _loads_flat
+
+def test_flat_config_round_trips_escapes_and_none():
+    config = {
+        'refresh_mode': 'auto',
+        'note': 'first line\nsecond line',
+        'path': 'C:\\data\\new\\n',
+        'last_refresh': None,
+        'auto_refresh_interval_days': 3
+    }
+    
+    data = _dumps_flat(config)
+    
+    assert b'None' not in data
+    assert len(data.splitlines()) == 4
+    assert _loads_flat(data) == {
+        'refresh_mode': 'auto',
+        'note': 'first line\nsecond line',
+        'path': 'C:\\data\\new\\n',
+        'auto_refresh_interval_days': 3
+    }
+
+def test_malformed_flat_config_is_not_overwritten(tmp_path, monkeypatch):
+    monkeypatch.setattr(ConfigManager, 'FLAT_FORMAT', True)
+    config_dir = tmp_path / 'data' / 'config'
+    config_dir.mkdir(parents=True)
+    config_file = config_dir / 'system_config.conf'
+    malformed = b'refresh_mode=auto\nlast_refresh=None\nnot a setting\n'
+    config_file.write_bytes(malformed)
+    
+    manager = ConfigManager(str(tmp_path))
+    manager.set_refresh_mode('manual')
+    manager.close()
+    
+    assert config_file.read_bytes() == malformed
@@ -0,0 +1,45 @@
+"""
+Tests for the query history writer and its shared string table.
+"""
+
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.interface.history import HistoryWriter
+
+def _response(query, answer, texts=()):
+    """Build a response dictionary with one source per text."""
+    return {
+        'query': query,
+        'answer': answer,
+        'sources': [{'video_id': 'v1', 'text': text} for text in texts]
+    }
+
+def test_history_round_trips_across_writers(tmp_path):
+    first = HistoryWriter(str(tmp_path), 'channel')
+    second = HistoryWriter(str(tmp_path), 'channel')
+    
+    # Interleave flushes so each writer interns strings the other one added
+    first.write('q1', _response('q1', 'shared answer', ['t1']), '2024-01-01T00:00:00')
+    first.flush()
+    second.write('q2', _response('q2', 'other answer', ['t2', 't1']), '2024-01-01T00:01:00')
+    second.flush()
+    first.write('q3', _response('q3', 'other answer'), '2024-01-01T00:02:00')
+    first.close()
+    second.close()
+    
+    records = list(HistoryWriter(str(tmp_path), 'channel').iter_history())
+    
+    assert [record['query'] for record in records] == ['q1', 'q2', 'q3']
+    assert records[0]['response'] == _response('q1', 'shared answer', ['t1'])
+    assert records[1]['response'] == _response('q2', 'other answer', ['t2', 't1'])
+    assert records[2]['response'] == _response('q3', 'other answer')
+    assert all(record['channel'] == 'channel' for record in records)
+    
+    # Each string is stored once
+    with open(os.path.join(str(tmp_path), 'channel', 'strings.jsonl'), 'rb') as f:
+        lines = f.read().splitlines()
+    assert len(lines) == len(set(lines))
@@ -7,24 +7,17 @@ by running a series of demo queries against the system.
 
 import os
 import sys
-import json
+import time
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.interface.cli import ConversationalCLI
+from src.utils.json_utils import dumps
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("test_queries.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 def run_demo_queries(base_dir, channel_name):
@@ -34,6 +27,9 @@ def run_demo_queries(base_dir, channel_name):
     Args:
         base_dir: Base directory of the project
         channel_name: Name of the channel (without @ symbol)
+        
+    Returns:
+        Path of the results file, one query result per line
     """
     logger.info(f"Starting demo query validation for channel {channel_name}")
     
@@ -53,40 +49,67 @@ def run_demo_queries(base_dir, channel_name):
     results_dir = os.path.join(base_dir, 'tests', 'results')
     os.makedirs(results_dir, exist_ok=True)
     
-    # Run queries and save results
-    results = []
-    for i, query in enumerate(demo_queries):
-        logger.info(f"Running demo query {i+1}/{len(demo_queries)}: {query}")
-        
-        try:
-            # Process query
-            response = cli.process_query(query)
-            
-            # Add to results
-            result = {
-                'query': query,
-                'response': response,
-                'timestamp': datetime.now().isoformat()
-            }
-            results.append(result)
-            
-            # Print response
-            print(f"\nQuery: {query}")
-            print(f"Response: {response['answer'][:200]}...\n")
-            
-        except Exception as e:
-            logger.error(f"Error processing query '{query}': {str(e)}", exc_info=True)
-            print(f"Error: {str(e)}")
+    # Wall clock is read once; query timestamps are offsets on the monotonic clock
+    start = datetime.now()
+    start_ns = time.monotonic_ns()
     
-    # Save all results
-    results_path = os.path.join(results_dir, f"demo_queries_{channel_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-    with open(results_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    # Results are written as each query completes, so they aren't all held
+    # in memory and survive a crash mid-run
+    results_path = os.path.join(results_dir, f"demo_queries_{channel_name}_{start.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    
+    # Queries are mostly spent waiting on the model and index, so they run
+    # concurrently; the lazily created components are created up front so
+    # the threads share them
+    cli.query_processor
+    cli.vector_db
+    
+    def run_query(query):
+        logger.info(f"Running demo query: {query}")
+        response = cli.process_query(query)
+        timestamp = (start + timedelta(microseconds=(time.monotonic_ns() - start_ns) // 1000)).isoformat()
+        return response, timestamp
+    
+    # Run queries and save results as they complete
+    with open(results_path, 'ab') as f, ThreadPoolExecutor(max_workers=len(demo_queries)) as executor:
+        futures = {executor.submit(run_query, query): query for query in demo_queries}
+        for i, future in enumerate(as_completed(futures)):
+            query = futures[future]
+            logger.info(f"Completed demo query {i+1}/{len(demo_queries)}: {query}")
+            
+            try:
+                response, timestamp = future.result()
+                
+                # Save result
+                result = {
+                    'query': query,
+                    'response': response,
+                    'timestamp': timestamp
+                }
+                f.write(dumps(result) + b'\n')
+                f.flush()
+                
+                # Print response
+                print(f"\nQuery: {query}")
+                print(f"Response: {response['answer'][:200]}...\n")
+                
+            except Exception as e:
+                logger.error(f"Error processing query '{query}': {str(e)}", exc_info=True)
+                print(f"Error: {str(e)}")
     
     logger.info(f"Demo query validation completed, results saved to {results_path}")
-    return results
+    return results_path
 
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("test_queries.log"),
+            logging.StreamHandler()
+        ]
+    )
+    
     # Get base directory
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     
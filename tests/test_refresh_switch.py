@@ -14,17 +14,8 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.interface.enhanced_cli import EnhancedCLI
-from src.utils.config import ConfigManager
+from src.utils.config import get_config_manager
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("test_refresh_switch.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 def test_refresh_switch(base_dir, channel_name):
@@ -76,7 +67,7 @@ def test_refresh_switch(base_dir, channel_name):
     print("Set refresh mode to auto")
     
     # Test 8: Simulate last refresh 8 days ago
-    config_manager = ConfigManager(base_dir)
+    config_manager = get_config_manager(base_dir)
     last_refresh = datetime.now() - timedelta(days=8)
     config_manager.set_last_refresh(last_refresh)
     logger.info(f"Set last refresh to 8 days ago: {last_refresh.isoformat()}")
@@ -102,6 +93,16 @@ def test_refresh_switch(base_dir, channel_name):
     }
 
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("test_refresh_switch.log"),
+            logging.StreamHandler()
+        ]
+    )
+    
     # Get base directory
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     